@@ -0,0 +1,207 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Default fleet: three trucks with room for 16 packages each.
+TRUCK_COUNT = 3
+TRUCK_CAPACITY = 16
+
+# Trucks from this index on leave when the first drivers return (see Distance.get_departure_time), so delayed packages
+# and packages waiting for an address correction go on them.
+LATE_TRUCK_INDEX = 2
+
+
+# Union-find (disjoint set) over package IDs, used to merge "Must be delivered with" notes into co-delivery groups.
+# Union by size with path compression, so every operation is near O(1) amortized.
+# Space complexity: O(n), where n is the number of package IDs added
+class DisjointSet:
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    # Returns the representative of the set holding key, adding key as a new set if it is unknown.
+    def find(self, key):
+        if key not in self.parent:
+            self.parent[key] = key
+            self.size[key] = 1
+            return key
+        root = key
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[key] != root:
+            self.parent[key], key = root, self.parent[key]
+        return root
+
+    # Merges the sets holding key1 and key2.
+    def union(self, key1, key2):
+        root1 = self.find(key1)
+        root2 = self.find(key2)
+        if root1 == root2:
+            return
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+
+
+# This function logs the package deadlines for each truck at the DEBUG level.
+# The time complexity is O(T * P) where T is the number of trucks and P is the number of packages, and O(1) when DEBUG
+# logging is off.
+# The space complexity is O(1)
+def log_truck_deadlines(trucks):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for i, truck in enumerate(trucks, start=1):
+        logger.debug("Truck %d delivery deadlines:", i)
+        for package in truck:
+            logger.debug("Package ID: %s, Deadline: %s", package[0], package[6])
+
+
+# Returns the truck index a package is pinned to by its special note, or None. "Can only be on truck N" pins it to
+# truck N; delayed packages and packages with a wrong address are pinned to the late trucks, returned as -1.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def get_required_truck(package, truck_count):
+    special_note = package[8]
+    match = re.search(r"Can only be on truck (\d+)", special_note)
+    if match:
+        truck_number = int(match.group(1))
+        if not 1 <= truck_number <= truck_count:
+            raise ValueError(f"Package {package[0]} can only be on truck {truck_number}, "
+                             f"but the fleet has {truck_count} trucks")
+        return truck_number - 1
+    if "Wrong address listed" in special_note or "Delayed" in special_note:
+        return -1
+    return None
+
+
+# Allocates packages to a fleet of truck_count trucks holding truck_capacity packages each and returns one list of
+# packages per truck, each sorted by deadline.
+# 1. Packages pinned by a special note go on their truck first: "Can only be on truck N" pins, then the delayed and
+#    wrong-address packages, which go on the first late truck with room.
+# 2. "Must be delivered with" notes are merged with a union-find into co-delivery groups; each group is loaded as a
+#    whole onto its pinned truck, or onto the first truck with room for all of it.
+# 3. The remaining packages with a deadline, then the end-of-day packages, fill the first truck with space.
+# No truck is loaded beyond truck_capacity. Packages that do not fit, including pinned packages whose truck is full,
+# are left out and logged as a warning; they stay at the hub.
+# Assigned packages are tracked in a set and the first non-full truck with a moving pointer, so allocation is
+# O(n log n) for the deadline sort and near O(n) otherwise.
+# Space complexity: O(n)
+def allocate_packages_to_trucks(packages_list, truck_count=TRUCK_COUNT, truck_capacity=TRUCK_CAPACITY):
+    logger.debug("Allocating packages to trucks function has started.")
+    trucks = [[] for _ in range(truck_count)]
+    late_trucks = list(range(min(LATE_TRUCK_INDEX, truck_count - 1), truck_count))
+    assigned = set()
+    unallocated = []
+    first_open_truck = 0
+
+    # Sort packages based on their deadlines
+    packages_list.sort(key=lambda x: x[6])
+
+    # Update EOD deadlines to 17:00 assuming that the official end of the day is 5:00 PM, and index the constraints.
+    packages_by_id = {}
+    required_trucks = {}
+    co_delivery = DisjointSet()
+    for package in packages_list:
+        if package[6] == "EOD":
+            package[6] = "17:00:00"
+        packages_by_id[package[0]] = package
+        required_truck = get_required_truck(package, truck_count)
+        if required_truck is not None:
+            required_trucks[package[0]] = required_truck
+        if package[8].startswith("Must be delivered with"):
+            for related_id in re.findall(r"\d+", package[8]):
+                co_delivery.union(package[0], related_id)
+
+    groups = {}
+    for package_id in co_delivery.parent:
+        if package_id in packages_by_id:
+            groups.setdefault(co_delivery.find(package_id), []).append(packages_by_id[package_id])
+    for group in groups.values():
+        group.sort(key=lambda x: x[6])
+
+    def has_room(truck_index, count):
+        return len(trucks[truck_index]) + count <= truck_capacity
+
+    def load(truck_index, packages):
+        trucks[truck_index].extend(packages)
+        assigned.update(package[0] for package in packages)
+
+    # Packages that cannot be loaded are marked as handled, so they are not loaded onto another truck later.
+    def leave_out(packages):
+        unallocated.extend(packages)
+        assigned.update(package[0] for package in packages)
+
+    # Resolves a pin to its truck, or a late-truck pin (-1) to the first late truck, that has room for count packages.
+    # Returns None when there is none.
+    def resolve(required_truck, count):
+        if required_truck != -1:
+            return required_truck if has_room(required_truck, count) else None
+        return next((truck_index for truck_index in late_trucks if has_room(truck_index, count)), None)
+
+    # Returns the first truck with room for count packages, or None.
+    def find_open_truck(count):
+        nonlocal first_open_truck
+        while first_open_truck < truck_count and not has_room(first_open_truck, 1):
+            first_open_truck += 1
+        for truck_index in range(first_open_truck, truck_count):
+            if has_room(truck_index, count):
+                return truck_index
+        return None
+
+    def get_group(package):
+        if package[0] not in co_delivery.parent:
+            return [package]
+        return groups[co_delivery.find(package[0])]
+
+    # First, allocate packages with specific constraints, together with their co-delivery group. Packages pinned to
+    # one truck go first, so packages that may go on any late truck do not fill the truck another package needs.
+    for late_pass in (False, True):
+        for package in packages_list:
+            if package[0] in required_trucks and package[0] not in assigned:
+                group = get_group(package)
+                pins = {required_trucks[member[0]] for member in group if member[0] in required_trucks}
+                if len(pins) > 1:
+                    raise ValueError(f"Packages {[member[0] for member in group]} must be delivered together "
+                                     f"but are pinned to different trucks")
+                required_truck = pins.pop()
+                if (required_truck == -1) != late_pass:
+                    continue
+                truck_index = resolve(required_truck, len(group))
+                if truck_index is None:
+                    leave_out(group)
+                    continue
+                load(truck_index, group)
+                logger.info("Packages %s have been allocated to truck %d due to the '%s' constraint.",
+                            [member[0] for member in group], truck_index + 1, package[8])
+
+    # Then, allocate co-delivery groups as a whole
+    for group in groups.values():
+        if group[0][0] not in assigned:
+            truck_index = find_open_truck(len(group))
+            if truck_index is None:
+                leave_out(group)
+            else:
+                load(truck_index, group)
+
+    # Allocate remaining packages, prioritizing those with a deadline
+    for deadline_pass in (True, False):
+        for package in packages_list:
+            if package[0] not in assigned and (package[6] != "17:00:00" or not deadline_pass):
+                truck_index = find_open_truck(1)
+                if truck_index is None:
+                    leave_out([package])
+                else:
+                    load(truck_index, [package])
+
+    # Sort packages based on delivery deadlines
+    for truck in trucks:
+        truck.sort(key=lambda x: x[6])
+
+    if unallocated:
+        logger.warning("%d packages could not be allocated to a truck with room: %s", len(unallocated),
+                       [package[0] for package in unallocated])
+    log_truck_deadlines(trucks)
+    logger.debug("Allocating packages to trucks function has finished.")
+    return trucks
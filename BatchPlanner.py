@@ -0,0 +1,171 @@
+import json
+import logging
+import math
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from Allocation import TRUCK_CAPACITY, TRUCK_COUNT
+from Distance import get_delivery_ledger, get_distance_matrix, get_travel_seconds_matrix, set_distance_matrix
+from Planner import Planner, ADDRESSES_FILE_PATH, DISTANCES_FILE_PATH
+from csvReader import iter_package_rows, read_csv_files
+
+logger = logging.getLogger(__name__)
+
+# The address network each worker maps: (addresses_dict, distances_dict), and the open map of the shared matrix file,
+# which has to stay open while the rows point into it.
+_worker_network = None
+_worker_map = None
+
+
+# Writes the shortest-path matrix (float64) followed by its travel time matrix in seconds (int64), both as full
+# V x V row-major blocks, so a worker can map them and slice rows without unpacking anything. float64 keeps arrival
+# times identical to a single planner's; the float32 DistanceMatrix file would round them.
+# Time complexity: O(V^2)
+# Space complexity: O(V), one row is buffered at a time
+def write_route_matrices(distance_matrix, travel_seconds, binary_file_path):
+    with open(binary_file_path, 'wb') as binary_file:
+        for row in distance_matrix:
+            array('d', row).tofile(binary_file)
+        for row in travel_seconds:
+            array('q', row).tofile(binary_file)
+
+
+# Maps a file written by write_route_matrices and returns (map, shortest-path rows, travel time rows). The rows are
+# memoryview slices of the mapped pages, so every process shares one copy of the matrices.
+# Time complexity: O(V)
+# Space complexity: O(V) for the row views
+def map_route_matrices(binary_file_path, size):
+    with open(binary_file_path, 'rb') as binary_file:
+        matrix_map = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+    block = size * size * 8
+    distances = memoryview(matrix_map)[:block].cast('d')
+    travel_seconds = memoryview(matrix_map)[block:2 * block].cast('q')
+    return (matrix_map, [distances[i * size:(i + 1) * size] for i in range(size)],
+            [travel_seconds[i * size:(i + 1) * size] for i in range(size)])
+
+
+# Pool initializer: reads the address network once per worker and registers the shared matrices with Distance, so
+# no worker runs Floyd-Warshall or holds its own copy of the matrices.
+def _init_worker(addresses_file_path, distances_file_path, binary_file_path, size):
+    global _worker_network, _worker_map
+    logging.basicConfig(level=logging.ERROR)
+    _worker_network = read_csv_files(addresses_file_path, distances_file_path)
+    _worker_map, distance_rows, travel_rows = map_route_matrices(binary_file_path, size)
+    set_distance_matrix(_worker_network[1], distance_rows, travel_rows)
+
+
+# Number of trucks for a manifest: the default fleet, or enough trucks to hold every package.
+# Time complexity: O(1)
+def get_truck_count(package_count, truck_capacity=TRUCK_CAPACITY):
+    return max(TRUCK_COUNT, math.ceil(package_count / truck_capacity))
+
+
+# Worker task: plans one manifest with a Planner over the shared network and returns its summary, the mileage of each
+# truck (get_distances) and its delivery ledger as (package ID, truck number, departure, delivery) rows. A manifest that
+# fails to plan is reported with its error instead of stopping the batch.
+# Time complexity: that of Planner.plan for one manifest
+# Space complexity: O(P) for P packages in the manifest
+def plan_manifest(packages_file_path, truck_capacity=TRUCK_CAPACITY):
+    start = time.perf_counter()
+    result = {"manifest": os.path.basename(packages_file_path)}
+    try:
+        package_count = sum(1 for _ in iter_package_rows(packages_file_path))
+        truck_count = get_truck_count(package_count, truck_capacity)
+        planner = Planner(packages_file_path=packages_file_path, truck_count=truck_count,
+                          truck_capacity=truck_capacity, events=(), network=_worker_network)
+        truck_distances, total_distance = planner.truck_distances
+        ledger = get_delivery_ledger(planner.trucks_with_paths)
+    except (OSError, ValueError, KeyError) as error:
+        result["error"] = str(error)
+        return result
+
+    result.update({
+        "packages": package_count,
+        "trucks": truck_count,
+        "truck_miles": [round(miles, 1) for miles in truck_distances],
+        "total_miles": round(total_distance, 1),
+        "unrouted_packages": package_count - len(ledger),
+        "seconds": round(time.perf_counter() - start, 6),
+        "deliveries": [(package_id, truck_number, departure.strftime('%H:%M:%S'), arrival.strftime('%H:%M:%S'))
+                       for package_id, truck_number, _, departure, arrival in ledger],
+    })
+    return result
+
+
+# Returns the manifest files (*.csv) of a directory in name order.
+def find_manifests(manifest_directory):
+    return [os.path.join(manifest_directory, name) for name in sorted(os.listdir(manifest_directory))
+            if name.lower().endswith('.csv')]
+
+
+# Plans every manifest of a directory against one address network in a process pool and returns the consolidated
+# report: per-manifest results in name order and the mileage totals. The shortest-path and travel time matrices are
+# computed once in the parent and written to a temporary file that every worker maps (see write_route_matrices).
+# Time complexity: O(V^3 + M * C / W) where M is the number of manifests, C the cost of planning one and W the number
+# of workers
+# Space complexity: O(V^2) for the shared file plus the results
+def plan_manifests(manifest_directory, addresses_file_path=ADDRESSES_FILE_PATH,
+                   distances_file_path=DISTANCES_FILE_PATH, truck_capacity=TRUCK_CAPACITY, workers=None):
+    manifests = find_manifests(manifest_directory)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    _, distances_dict = read_csv_files(addresses_file_path, distances_file_path)
+    distance_matrix = get_distance_matrix(distances_dict)
+    travel_seconds = get_travel_seconds_matrix(distance_matrix)
+
+    file_descriptor, binary_file_path = tempfile.mkstemp(suffix='.bin')
+    os.close(file_descriptor)
+    try:
+        write_route_matrices(distance_matrix, travel_seconds, binary_file_path)
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(addresses_file_path, distances_file_path, binary_file_path,
+                                           len(distance_matrix))) as executor:
+            results = list(executor.map(plan_manifest, manifests, [truck_capacity] * len(manifests)))
+    finally:
+        os.remove(binary_file_path)
+
+    planned = [result for result in results if "error" not in result]
+    return {
+        "addresses": addresses_file_path,
+        "distances": distances_file_path,
+        "workers": workers,
+        "manifests": results,
+        "planned_manifests": len(planned),
+        "failed_manifests": len(results) - len(planned),
+        "total_miles": round(sum(result["total_miles"] for result in planned), 1),
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+
+# Usage: python BatchPlanner.py <manifest directory> [output.json] [workers] [Addresses.csv Distances.csv]
+# Plans every *.csv package manifest in the directory against the address network (CSV/Addresses.csv and
+# CSV/Distances.csv by default), writes the consolidated report to output.json (default batch_plan.json) and prints the
+# mileage per manifest. A workers value of 0 uses every core.
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3, 4, 6):
+        print("Usage: python BatchPlanner.py <manifest directory> [output.json] [workers] "
+              "[Addresses.csv Distances.csv]")
+        sys.exit(1)
+    logging.basicConfig(level=logging.ERROR)
+    output_file_path = sys.argv[2] if len(sys.argv) > 2 else 'batch_plan.json'
+    network_file_paths = sys.argv[4:6] or [ADDRESSES_FILE_PATH, DISTANCES_FILE_PATH]
+    report = plan_manifests(sys.argv[1], *network_file_paths,
+                            workers=int(sys.argv[3]) if len(sys.argv) > 3 else None)
+    with open(output_file_path, 'w') as output_file:
+        json.dump(report, output_file, indent=1)
+
+    print("Manifest".ljust(32) + "Packages".rjust(10) + "Trucks".rjust(8) + "Miles".rjust(10) + "Unrouted".rjust(10))
+    for result in report["manifests"]:
+        if "error" in result:
+            print(result["manifest"].ljust(32) + f"  error: {result['error']}")
+        else:
+            print(result["manifest"].ljust(32) + str(result["packages"]).rjust(10) + str(result["trucks"]).rjust(8)
+                  + f"{result['total_miles']:.1f}".rjust(10) + str(result["unrouted_packages"]).rjust(10))
+    print(f"{report['planned_manifests']} manifests, {report['total_miles']:.1f} miles in {report['seconds']:.2f}s; "
+          f"results written to {output_file_path}")
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import logging
+import sys
+
+from Planner import Planner, PLAN_CACHE_DIRECTORY
+from TrackerService import PlanSnapshot, parse_query_time
+
+# Columns of the answers, in CSV order. A query that cannot be answered has only query_id, time and error filled in.
+ANSWER_FIELDS = ("query_id", "time", "id", "address", "city", "state", "zip", "deadline", "weight", "note", "status",
+                 "departure", "delivery", "error")
+
+# Query ID that asks for every package at the given time.
+ALL_PACKAGES = 'all'
+
+# Number of distinct times whose 'all' answers are kept formatted.
+FORMATTED_SNAPSHOT_CACHE_SIZE = 64
+
+
+# Yields (package ID or 'all', time string) from a query stream with one 'package_id,time' pair per line. Blank lines,
+# '#' comments and a 'package,time' header line are skipped.
+# Time complexity: O(Q) where Q is the number of lines
+# Space complexity: O(1)
+def iter_queries(lines):
+    for row in csv.reader(lines):
+        if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+            continue
+        query_id = row[0].strip()
+        if query_id.lower() in ('package', 'package_id', 'id'):
+            continue
+        yield query_id, row[1].strip() if len(row) > 1 else ''
+
+
+# Formats answers as CSV rows or JSON Lines. One formatter is reused for a whole batch.
+class AnswerFormatter:
+    def __init__(self, output_format='csv'):
+        if output_format not in ('csv', 'json'):
+            raise ValueError(f"unknown output format {output_format!r}")
+        self.output_format = output_format
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+
+    # The CSV header line, or nothing for JSON Lines.
+    def header(self):
+        return ','.join(ANSWER_FIELDS) + '\n' if self.output_format == 'csv' else ''
+
+    # Time complexity: O(A) where A is the number of answers
+    def format(self, answers):
+        if self.output_format == 'json':
+            return ''.join(json.dumps(answer) + '\n' for answer in answers)
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerows(map(answer.get, ANSWER_FIELDS) for answer in answers)
+        return self._buffer.getvalue()
+
+
+# Answers a stream of queries from one plan snapshot and streams the answers to output as CSV (with a header) or JSON
+# Lines, one answer per package query and one per package for 'all' queries. Each distinct time string is parsed once,
+# and the formatted answer to an 'all' query is reused for later 'all' queries at the same time. Unknown packages and
+# malformed times are answered with an error instead of stopping the batch. Returns the number of queries answered.
+# Time complexity: O(Q + A * P) plus the size of the output, where Q is the number of queries, A the number of distinct
+# 'all' times and P the number of packages
+# Space complexity: O(D + P) where D is the number of distinct time strings
+def run_queries(plan, lines, output, output_format='csv'):
+    formatter = AnswerFormatter(output_format)
+    output.write(formatter.header())
+
+    parsed_times = {}
+    formatted_snapshots = {}
+    query_count = 0
+    for query_id, time_string in iter_queries(lines):
+        query_count += 1
+        seconds = parsed_times.get(time_string)
+        if seconds is None:
+            try:
+                seconds = parse_query_time(time_string)
+            except ValueError as error:
+                seconds = str(error)
+            parsed_times[time_string] = seconds
+        if isinstance(seconds, str):
+            output.write(formatter.format([{"query_id": query_id, "time": time_string, "error": seconds}]))
+            continue
+
+        if query_id.lower() == ALL_PACKAGES:
+            formatted = formatted_snapshots.get(time_string)
+            if formatted is None:
+                formatted = formatter.format([dict(answer, query_id=ALL_PACKAGES, time=time_string)
+                                              for answer in plan.snapshot(seconds)])
+                if len(formatted_snapshots) < FORMATTED_SNAPSHOT_CACHE_SIZE:
+                    formatted_snapshots[time_string] = formatted
+            output.write(formatted)
+            continue
+
+        answer = plan.package_status(query_id, seconds) or {"error": f"unknown package {query_id}"}
+        answer.update(query_id=query_id, time=time_string)
+        output.write(formatter.format([answer]))
+    return query_count
+
+
+# Usage: python BatchQuery.py [queries.csv | -] [--json]
+# Reads 'package_id,time' queries (package ID or 'all') from the file or stdin and streams the answers to stdout. The
+# plan is computed once, or loaded from the plan cache when the inputs are unchanged.
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    arguments = [argument for argument in sys.argv[1:] if argument != '--json']
+    answer_format = 'json' if '--json' in sys.argv[1:] else 'csv'
+    plan_snapshot = PlanSnapshot(Planner(cache_directory=PLAN_CACHE_DIRECTORY))
+    if not arguments or arguments[0] == '-':
+        run_queries(plan_snapshot, sys.stdin, sys.stdout, answer_format)
+    else:
+        with open(arguments[0], newline='') as query_file:
+            run_queries(plan_snapshot, query_file, sys.stdout, answer_format)
@@ -0,0 +1,143 @@
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Allocation import allocate_packages_to_trucks, TRUCK_CAPACITY
+from Distance import find_shortest_path, get_delivery_ledger, get_distances
+from Package import publish_delivery_ledger
+from PackageIndex import PackageIndexes
+from SyntheticData import write_dataset
+from csvReader import build_address_index, load_packages, read_csv_files, read_packages
+
+# Default manifest sizes; larger ones, up to 100000 packages, can be given on the command line.
+BENCHMARK_SIZES = (100, 1000, 10000)
+
+# The Floyd-Warshall matrix is O(V^3), so the number of distinct locations grows with the manifest up to this cap.
+MAX_LOCATIONS = 300
+
+
+# Number of locations and trucks used for a synthetic manifest of package_count packages. The fleet has room for every
+# package plus a spare truck for every ten.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def get_dataset_size(package_count, truck_capacity=TRUCK_CAPACITY):
+    location_count = min(max(27, package_count // 10), MAX_LOCATIONS)
+    truck_count = math.ceil(package_count / truck_capacity)
+    return location_count, max(3, truck_count + math.ceil(truck_count / 10))
+
+
+# Runs the planning pipeline stage by stage on one dataset and returns ({stage: seconds or peak bytes}, trucks with
+# paths, package list). With trace_memory the value of each stage is its tracemalloc peak instead of its duration.
+# Time complexity: that of the pipeline, O(V^3 + P log P + T * P_t^2) for V locations, P packages and T trucks
+# holding P_t packages each.
+# Space complexity: O(V^2 + P)
+def run_pipeline(file_paths, truck_count, trace_memory=False):
+    addresses_file_path, distances_file_path, packages_file_path = file_paths
+    results = {}
+
+    def stage(name, function):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            value = function()
+            results[name] = tracemalloc.get_traced_memory()[1]
+        else:
+            start = time.perf_counter()
+            value = function()
+            results[name] = time.perf_counter() - start
+        return value
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        addresses_dict, distances_dict = stage('read_csv_files',
+                                               lambda: read_csv_files(addresses_file_path, distances_file_path))
+        address_index = build_address_index(addresses_dict)
+        # The streaming load (hash table and indexes, no package list) is measured on its own, next to read_packages.
+        stage('load_packages', lambda: load_packages(packages_file_path, address_index, PackageIndexes()))
+        package_hash_table, package_list = stage('read_packages',
+                                                 lambda: read_packages(packages_file_path, address_index))
+        allocated_trucks = stage('allocate_packages_to_trucks',
+                                 lambda: allocate_packages_to_trucks(package_list, truck_count))
+        trucks_with_paths = stage('find_shortest_path',
+                                  lambda: find_shortest_path(allocated_trucks, addresses_dict, distances_dict))
+        stage('publish_delivery_ledger',
+              lambda: publish_delivery_ledger(get_delivery_ledger(trucks_with_paths), package_hash_table))
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return results, trucks_with_paths, package_list
+
+
+# Generates a seeded synthetic dataset of package_count packages, runs the pipeline once for timings and once under
+# tracemalloc for peak memory, and returns the measurements with the route mileage.
+# Time complexity: that of run_pipeline.
+# Space complexity: O(V^2 + P)
+def benchmark_size(package_count, seed=0):
+    location_count, truck_count = get_dataset_size(package_count)
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        file_paths = write_dataset(temporary_directory, package_count, location_count, truck_count, seed)
+        seconds, trucks_with_paths, package_list = run_pipeline(file_paths, truck_count)
+        peak_memory, _, _ = run_pipeline(file_paths, truck_count, trace_memory=True)
+
+    truck_distances, total_distance = get_distances(trucks_with_paths)
+    return {
+        "packages": package_count,
+        "locations": location_count,
+        "trucks": truck_count,
+        "seed": seed,
+        "stages": {name: {"seconds": round(seconds[name], 6), "peak_memory_bytes": peak_memory[name]}
+                   for name in seconds},
+        "total_seconds": round(sum(seconds.values()), 6),
+        "total_miles": round(total_distance, 1),
+        "max_truck_miles": round(max(truck_distances), 1),
+        "unrouted_packages": sum(1 for package_info in package_list if not package_info[9]),
+    }
+
+
+# Returns the current git commit of the repository, or None outside a git checkout.
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Benchmarks every size and returns the JSON-ready report.
+def run_benchmarks(sizes=BENCHMARK_SIZES, seed=0):
+    return {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [benchmark_size(package_count, seed) for package_count in sizes],
+    }
+
+
+# Usage: python Benchmark.py [output.json] [seed] [sizes...]
+# Writes the report to output.json (default benchmark.json) and prints a summary table. The router's warnings about
+# unroutable packages are silenced; how many packages each manifest leaves unrouted is a result like the mileage, in
+# the report and the table.
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    output_file_path = sys.argv[1] if len(sys.argv) > 1 else 'benchmark.json'
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    sizes = [int(size) for size in sys.argv[3:]] or BENCHMARK_SIZES
+    report = run_benchmarks(sizes, seed)
+    with open(output_file_path, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+
+    stages = list(report["runs"][0]["stages"])
+    print("Packages".ljust(10) + "".join(name.rjust(28) for name in stages) + "Miles".rjust(12) + "Unrouted".rjust(10))
+    for run in report["runs"]:
+        cells = "".join(f"{run['stages'][name]['seconds']:.4f}s {run['stages'][name]['peak_memory_bytes'] / 1e6:.1f}MB"
+                        .rjust(28) for name in stages)
+        print(str(run["packages"]).ljust(10) + cells + f"{run['total_miles']:.1f}".rjust(12)
+              + str(run["unrouted_packages"]).rjust(10))
+    print(f"Results written to {output_file_path}")
@@ -1,20 +1,42 @@
 import csv
 import datetime
 import heapq
+import logging
+from array import array
 from datetime import timedelta
 
+from Profiler import profiler
+
+logger = logging.getLogger(__name__)
+
 
 # Rev1
 # This function returns the index of an address in the addresses dictionary.
 # Time complexity: O(V) where V is the number of vertices in the graph.
 # Space complexity: O(1)
 def find_location_index_by_address(address, addresses_dict):
+    if profiler.enabled:
+        profiler.count('address_lookups')
     for index, (_, location_address) in addresses_dict.items():
         if location_address == address:
             return index
     return None
 
 
+# Returns the direct distance between two locations in either orientation. The distances dictionary only holds the
+# lower triangle of the matrix and drops zero entries, so a location's distance to itself is 0.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def get_distance(distances_dict, index1, index2):
+    if (index1, index2) in distances_dict:
+        return distances_dict[(index1, index2)]
+    if (index2, index1) in distances_dict:
+        return distances_dict[(index2, index1)]
+    if index1 == index2:
+        return 0
+    raise KeyError(f"Both key {(index1, index2)} and {(index2, index1)} not found in distances_dict")
+
+
 # Dijkstra algorithm for finding the shortest path from a start node to all other nodes in a graph.
 # Overall time complexity of the Dijkstra's algorithm is O((V + E) log(V)).
 # Overall space complexity is O(V).
@@ -22,6 +44,7 @@ def dijkstra(graph, start):
     shortest_paths = {start: 0}
     unvisited_nodes = [(0, start)]
     visited_nodes = set()
+    heap_pushes = 1
 
     while unvisited_nodes:
         current_min_distance, current_node = heapq.heappop(unvisited_nodes)
@@ -32,114 +55,292 @@ def dijkstra(graph, start):
                 if neighbor not in shortest_paths or new_distance < shortest_paths[neighbor]:
                     shortest_paths[neighbor] = new_distance
                     heapq.heappush(unvisited_nodes, (new_distance, neighbor))
+                    heap_pushes += 1
+    if profiler.enabled:
+        profiler.count('dijkstra_calls')
+        profiler.count('heap_pushes', heap_pushes)
     return shortest_paths
 
 
-# Updates the address of package 9 to the correct address.
+# Cache of all-pairs shortest path matrices, keyed by the distance entries of the address set they were built from.
+_distance_matrix_cache = {}
+
+# The distances dictionary and its matrix from the last get_distance_matrix call. The routers ask for the matrix of the
+# same dictionary once or twice per truck, and this skips hashing every entry on those calls. A dictionary changed in
+# place must be passed to clear_distance_matrix (or set_distance_matrix) before the next get_distance_matrix call.
+_last_distance_matrix = (None, None)
+
+
+# Builds the all-pairs shortest path matrix with the Floyd-Warshall algorithm, so that matrix[i][j] is the shortest
+# distance between locations i and j. Each row is relaxed as a whole with a list comprehension.
+# Time complexity: O(V^3) where V is the number of vertices.
+# Space complexity: O(V^2) where V is the number of vertices.
+def build_distance_matrix(distances_dict):
+    size = max(max(index1, index2) for index1, index2 in distances_dict) + 1 if distances_dict else 0
+    infinity = float("inf")
+    matrix = [[infinity] * size for _ in range(size)]
+    for index in range(size):
+        matrix[index][index] = 0
+
+    for (index1, index2), distance in distances_dict.items():
+        if distance < matrix[index1][index2]:
+            matrix[index1][index2] = distance
+            matrix[index2][index1] = distance
+
+    for k in range(size):
+        row_k = matrix[k]
+        for i in range(size):
+            distance_ik = matrix[i][k]
+            if distance_ik == infinity:
+                continue
+            matrix[i] = [d if d <= distance_ik + d_kj else distance_ik + d_kj for d, d_kj in zip(matrix[i], row_k)]
+    return matrix
+
+
+# Returns the all-pairs shortest path matrix for an address set, computing it only the first time that set is seen.
+# The routing loop then reads the distance between any two locations in O(1). The matrix of the last dictionary is
+# returned without looking at its entries, so after changing a dictionary in place call clear_distance_matrix.
+# Time complexity: O(1) when called again with the same dictionary, O(V^2) on a cache hit (hashing the distance
+# entries), O(V^3) on a miss.
+# Space complexity: O(V^2) where V is the number of vertices.
+def get_distance_matrix(distances_dict):
+    global _last_distance_matrix
+    last_distances_dict, matrix = _last_distance_matrix
+    if distances_dict is last_distances_dict:
+        if profiler.enabled:
+            profiler.count('distance_matrix_requests')
+        return matrix
+
+    key = frozenset(distances_dict.items())
+    matrix = _distance_matrix_cache.get(key)
+    if matrix is None:
+        with profiler.stage('build_distance_matrix'):
+            matrix = build_distance_matrix(distances_dict)
+        _distance_matrix_cache[key] = matrix
+        if profiler.enabled:
+            profiler.count('distance_matrix_builds')
+    _last_distance_matrix = (distances_dict, matrix)
+    if profiler.enabled:
+        profiler.count('distance_matrix_requests')
+    return matrix
+
+
+# Forgets the dictionary of the last get_distance_matrix call, so its next call hashes the distance entries again and
+# finds (or builds) the matrix of their current values. Call it after changing a distances dictionary in place.
 # Time complexity: O(1)
 # Space complexity: O(1)
-def update_package9_info(package_info, corrected_package9_address):
-    if package_info[0] == "9":
-        package_info[2] = corrected_package9_address[0]
-        package_info[5] = corrected_package9_address[3]
-    return package_info
+def clear_distance_matrix():
+    global _last_distance_matrix
+    _last_distance_matrix = (None, None)
+
+
+# Registers a shortest path matrix computed elsewhere for distances_dict, such as the rows BatchPlanner workers map
+# from a shared file, so get_distance_matrix returns it instead of building one. The rows only need to support
+# indexing. travel_seconds, when given, is registered as its get_travel_seconds_matrix result.
+# Time complexity: O(V^2) for hashing the distance entries
+# Space complexity: O(1) beyond the matrices, which are kept by reference
+def set_distance_matrix(distances_dict, matrix, travel_seconds=None):
+    global _last_distance_matrix
+    _distance_matrix_cache[frozenset(distances_dict.items())] = matrix
+    _last_distance_matrix = (distances_dict, matrix)
+    if travel_seconds is not None:
+        _travel_seconds_cache[id(matrix)] = travel_seconds
+
+
+# Address of the hub every truck leaves from and returns to.
+HUB_ADDRESS = "4001 South 700 East"
+
+# Average speed of trucks is 18 miles per hour.
+SPEED_LIMIT = 18
+
+
+# Returns the whole seconds after midnight of a routing time. The router keeps its clock in integer seconds and only
+# turns it back into datetime objects when a route is returned.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def datetime_to_seconds(time):
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+# Cache of travel time matrices in whole seconds, keyed by the id of the shortest path matrix they were derived from.
+# The shortest path matrices stay in _distance_matrix_cache, so their ids are never reused.
+_travel_seconds_cache = {}
+
+
+# Returns the shortest-path travel time between every pair of locations in whole seconds at SPEED_LIMIT, as one typed
+# array per row, computed once per address set.
+# Time complexity: O(V^2) on the first call for an address set, O(1) afterwards.
+# Space complexity: O(V^2)
+def get_travel_seconds_matrix(distance_matrix):
+    travel_seconds = _travel_seconds_cache.get(id(distance_matrix))
+    if travel_seconds is None:
+        travel_seconds = [array('l', (round(distance * 3600 / SPEED_LIMIT) if distance != float("inf") else 2 ** 31 - 1
+                                      for distance in row))
+                          for row in distance_matrix]
+        _travel_seconds_cache[id(distance_matrix)] = travel_seconds
+    return travel_seconds
+
+
+# Greedy nearest-neighbour route for one truck leaving the hub (or start_index, for a truck re-routed mid-route by
+# Replanner) at departure_time. The truck's packages are grouped into stops, one per location ID (group_truck_stops),
+# and at each step the truck drives to the closest remaining stop that it can still reach by that stop's deadline, the
+# earliest deadline of the truck's packages delivered there (see get_stop_deadlines). Every package of the stop is then
+# delivered at the same arrival time. Returns the truck's path, the distance of each leg, the arrival time at each stop
+# and the ID of the package delivered at each stop (see get_delivery_ledger), with one path entry per package as built
+# by build_truck_path.
+# The shortest distances come from the cached all-pairs matrix (get_distance_matrix), not a Dijkstra run per step.
+# The remaining stops are kept as parallel lists of location IDs and deadlines in seconds, and the clock is an
+# integer number of seconds, so no timedelta or datetime objects are created per candidate. Picking the next stop is an
+# argmin over the distances of all remaining stops, gathered with map/min/index at C speed; only when that stop would
+# be missed does the step fall back to a masked argmin over the deadline-feasible candidates. Ties go to the stop whose
+# first package comes first on the truck.
+# When no remaining stop can be reached by its deadline the route ends there and the rest of the truck's packages are
+# left unrouted, unless deliver_late is set: Replanner sets it for a truck already on the road, whose packages cannot
+# go back to the hub, and the truck then drives to the closest remaining stop and delivers those packages late.
+# Time complexity: O(V^2 + P + S^2) where P is the number of packages on the truck, S the number of distinct stops and
+# V the number of vertices.
+# Space complexity: O(P)
+def find_truck_path(truck, departure_time, hub_index, deadlines_dict, distances_dict, start_index=None,
+                    deliver_late=False):
+    distance_matrix = get_distance_matrix(distances_dict)
+    travel_seconds = get_travel_seconds_matrix(distance_matrix)
+    current_seconds = datetime_to_seconds(departure_time)
+
+    stops, stop_packages = group_truck_stops(truck)
+    remaining_stops = [stop for stop in stops if stop is not None]
+    remaining_deadlines = [datetime_to_seconds(deadline)
+                           for deadline in get_stop_deadlines(remaining_stops, stop_packages, deadlines_dict)]
+    stop_order = []
+    late_packages = []
+    rejected_candidates = 0
+
+    last_location_index = hub_index if start_index is None else start_index
+    while remaining_stops:
+        shortest_paths = distance_matrix[last_location_index]
+        travel_row = travel_seconds[last_location_index]
+        distances = list(map(shortest_paths.__getitem__, remaining_stops))
+        position = distances.index(min(distances))
+        if current_seconds + travel_row[remaining_stops[position]] > remaining_deadlines[position]:
+            candidates = [(distance, position) for position, (distance, stop, deadline)
+                          in enumerate(zip(distances, remaining_stops, remaining_deadlines))
+                          if current_seconds + travel_row[stop] <= deadline]
+            rejected_candidates += len(distances) - len(candidates)
+            if candidates:
+                _, position = min(candidates)
+            elif deliver_late:
+                late_packages.extend(stop_packages[remaining_stops[position]])
+            else:
+                break
+
+        last_location_index = remaining_stops.pop(position)
+        del remaining_deadlines[position]
+        stop_order.append(last_location_index)
+        current_seconds += travel_row[last_location_index]
+
+    if remaining_stops or None in stop_packages:
+        remaining_packages = [package_id for stop in remaining_stops for package_id in stop_packages[stop]]
+        logger.warning("No next location found. Remaining packages: %s",
+                       remaining_packages + stop_packages.get(None, []))
+    if late_packages:
+        logger.warning("Packages %s will be delivered after their deadline", late_packages)
+    if profiler.enabled:
+        profiler.count('rejected_deadline_candidates', rejected_candidates)
+    return build_truck_path(stop_order, stop_packages, departure_time, hub_index, distances_dict, start_index)
 
 
 # Finds the shortest path for each truck and returns a list of addresses for each truck, a list of distances for each
-# truck, and a list of arrival times (delivery times) for each truck. It also updates the address of package 9 to the
-# correct address when the current_time is 10:20 AM. The path of each truck starts from the hub and ends at the hub.
+# truck, and a list of arrival times (delivery times) for each truck. The path of each truck starts from the hub and
+# ends at the hub. Mid-day changes such as address corrections are applied afterwards by Replanner.
 # So, the distance from the last package of each truck is included in calculation of total distances of all trucks.
-# Time complexity: O(TP + V^2 + TP(V^2 log V)) T is the number of trucks, P is the number of packages, and V is the
-# number of vertices in the graph.
+# Packages are routed by the location ID interned at load time (package_info[1]), so no address strings are compared.
+# Each truck is routed by truck_router, which defaults to the greedy find_truck_path and takes the same arguments.
+# Time complexity: O(V^3 + TP^2) on the first call for an address set and O(TV^2 + TP^2) afterwards, where T is
+# the number of trucks, P is the number of packages, and V is the number of vertices in the graph.
 # Space complexity: O(V^2 + TP) where T is the number of trucks, P is the number of packages, and V is the number of
 # vertices in the graph.
-def find_shortest_path(allocated_trucks, addresses_dict, distances_dict):
-    hub_address = "4001 South 700 East"
-    hub_index = find_location_index_by_address(hub_address, addresses_dict)
+def find_shortest_path(allocated_trucks, addresses_dict, distances_dict, truck_router=find_truck_path):
+    hub_index, deadlines_dict = prepare_deadlines(allocated_trucks, addresses_dict)
+    trucks_with_paths = []
 
-    corrected_package9_address = ["410 S State St", "Salt Lake City", "UT", "84111"]
+    for truck_index, truck in enumerate(allocated_trucks):
+        departure_time = get_departure_time(truck_index, trucks_with_paths)
+        trucks_with_paths.append(truck_router(truck, departure_time, hub_index, deadlines_dict, distances_dict))
+    return trucks_with_paths
 
-    packages_dict = {}
-    deadlines_dict = {}
-    trucks_with_paths = []
 
-    # Average speed of trucks is 18 miles per hour.
-    SPEED_LIMIT = 18
+# Returns the hub's location ID and the deadline of every package on the trucks, keyed by package ID, as used by the
+# truck routers. Deadlines are kept per package rather than per location,
+# so packages sharing an address no longer overwrite each other's deadline; get_stop_deadlines combines them per stop.
+# Time complexity: O(TP + V) where T is the number of trucks, P is the number of packages and V the number of vertices.
+# Space complexity: O(TP)
+def prepare_deadlines(allocated_trucks, addresses_dict):
+    hub_index = find_location_index_by_address(HUB_ADDRESS, addresses_dict)
 
+    deadlines_dict = {}
     for truck in allocated_trucks:
         for package_info in truck:
-            package_info = update_package9_info(package_info, corrected_package9_address)
-            package_id = package_info[0]
-            package_address = package_info[2]
-            deadline = package_info[6]
-            index = find_location_index_by_address(package_address, addresses_dict)
-            packages_dict[package_id] = package_address
-            deadlines_dict[index] = datetime.datetime.strptime(deadline, "%H:%M:%S")
-
-    graph = {}
-    for (index1, index2), distance in distances_dict.items():
-        if index1 not in graph:
-            graph[index1] = {}
-        if index2 not in graph:
-            graph[index2] = {}
-        graph[index1][index2] = distance
-        graph[index2][index1] = distance
+            deadlines_dict[package_info[0]] = datetime.datetime.strptime(package_info[6], "%H:%M:%S")
+    return hub_index, deadlines_dict
 
-    departure_times = [datetime.datetime.strptime("08:00:00", "%H:%M:%S")] * 2
 
-    for truck_index, truck in enumerate(allocated_trucks):
-        if truck_index == 2:
-            earliest_arrival_time = min(trucks_with_paths[0]['times'][-1], trucks_with_paths[1]['times'][-1])
-            departure_times.append(earliest_arrival_time)
-
-        current_time = departure_times[truck_index]
-
-        path = [hub_index]
-        path_distances = []
-        path_times = [current_time]
-        remaining_packages = [package_info[0] for package_info in truck]
-
-        while remaining_packages:
-            last_location_index = path[-1]
-            shortest_paths = dijkstra(graph, last_location_index)
-
-            min_distance = float("inf")
-            next_location_index = None
-            next_package_id = None
-            for package_id in remaining_packages:
-                package_index = find_location_index_by_address(packages_dict[package_id], addresses_dict)
-                if package_index is not None and shortest_paths[package_index] < min_distance:
-                    new_time = current_time + timedelta(hours=shortest_paths[package_index] / SPEED_LIMIT)
-                    if new_time <= deadlines_dict[package_index]:
-                        min_distance = shortest_paths[package_index]
-                        next_location_index = package_index
-                        next_package_id = package_id
-
-            if next_location_index is not None:
-                path.append(next_location_index)
-                remaining_packages.remove(next_package_id)
-                current_time = current_time + timedelta(hours=min_distance / SPEED_LIMIT)
-
-                key = (last_location_index, next_location_index)
-                reversed_key = (next_location_index, last_location_index)
-                if key in distances_dict:
-                    path_distances.append(distances_dict[key])
-                elif reversed_key in distances_dict:
-                    path_distances.append(distances_dict[reversed_key])
-                elif key == reversed_key:
-                    path_distances.append(0)
-                else:
-                    raise KeyError(f"Both key {key} and {reversed_key} not found in distances_dict")
-
-                path_times.append(current_time)
-            else:
-                print("No next location found. Remaining packages:", remaining_packages)
-                break
+# Returns the departure time of a truck. The first two trucks leave at 08:00 with the two drivers; every later truck
+# leaves when the first of those two trucks has made its last delivery.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def get_departure_time(truck_index, trucks_with_paths):
+    if truck_index < 2:
+        return datetime.datetime.strptime("08:00:00", "%H:%M:%S")
+    return min(trucks_with_paths[0]['times'][-1], trucks_with_paths[1]['times'][-1])
 
-        path.append(hub_index)
-        path_distances.append(distances_dict[(path[-2], hub_index)])
-        trucks_with_paths.append({"path": path, "distances": path_distances, "times": path_times})
-    return trucks_with_paths
+
+# Groups a truck's packages into distinct stops. Returns the location IDs in first-seen order and the IDs of the
+# packages for each location.
+# Time complexity: O(P) where P is the number of packages on the truck.
+# Space complexity: O(P)
+def group_truck_stops(truck):
+    stops = []
+    stop_packages = {}
+    for package_info in truck:
+        location_index = package_info[1]
+        if location_index not in stop_packages:
+            stop_packages[location_index] = []
+            stops.append(location_index)
+        stop_packages[location_index].append(package_info[0])
+    return stops, stop_packages
+
+
+# Returns the deadline of each stop: the earliest deadline of the packages delivered there.
+# Time complexity: O(P) where P is the number of packages on the truck.
+# Space complexity: O(S) where S is the number of stops.
+def get_stop_deadlines(stops, stop_packages, deadlines_dict):
+    return [min(deadlines_dict[package_id] for package_id in stop_packages[stop]) for stop in stops]
+
+
+# Expands an order of stops into a route from the hub (or start_index) back to the hub, with one path entry per package
+# so that every package at a stop is delivered at the same arrival time. Arrivals are counted in whole seconds of
+# shortest-path travel time (see get_travel_seconds_matrix), and a datetime is created once per stop.
+# Time complexity: O(P) where P is the number of packages on the truck.
+# Space complexity: O(P)
+def build_truck_path(stop_order, stop_packages, departure_time, hub_index, distances_dict, start_index=None):
+    travel_seconds = get_travel_seconds_matrix(get_distance_matrix(distances_dict))
+    elapsed_seconds = 0
+    path = [hub_index if start_index is None else start_index]
+    path_distances = []
+    path_times = [departure_time]
+    path_packages = []
+    for stop in stop_order:
+        elapsed_seconds += travel_seconds[path[-1]][stop]
+        arrival_time = departure_time + timedelta(seconds=elapsed_seconds)
+        path_distances.append(get_distance(distances_dict, path[-1], stop))
+        path_distances.extend([0] * (len(stop_packages[stop]) - 1))
+        for package_id in stop_packages[stop]:
+            path.append(stop)
+            path_times.append(arrival_time)
+            path_packages.append(package_id)
+
+    path.append(hub_index)
+    path_distances.append(get_distance(distances_dict, path[-2], hub_index))
+    return {"path": path, "distances": path_distances, "times": path_times, "packages": path_packages}
 
 
 # Rev 4/6/2023 gets distances for each truck and total distance for all trucks from trucks_with_paths
@@ -155,3 +356,17 @@ def get_distances(trucks):
         total_distance += distance_sum
 
     return truck_distances, total_distance
+
+
+# Returns the delivery ledger of a plan: one (package ID, truck number, stop index, departure time, arrival time) record
+# per delivered package, read straight from the package IDs each router records next to its path. The stop index is the
+# package's position in its truck's path, so the hub departure is stop 0.
+# Time complexity: O(P) where P is the number of delivered packages.
+# Space complexity: O(P)
+def get_delivery_ledger(trucks_with_paths):
+    ledger = []
+    for truck_number, truck in enumerate(trucks_with_paths, start=1):
+        departure_time = truck['times'][0]
+        for stop_index, (package_id, arrival_time) in enumerate(zip(truck['packages'], truck['times'][1:]), start=1):
+            ledger.append((package_id, truck_number, stop_index, departure_time, arrival_time))
+    return ledger
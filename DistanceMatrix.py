@@ -0,0 +1,127 @@
+import csv
+import mmap
+import struct
+import sys
+from array import array
+
+# File layout: a 16 byte header (magic, version, number of locations, reserved) followed by the lower triangle of the
+# distance matrix, diagonal included, packed row by row as little-endian float32 values.
+MAGIC = b'WGDM'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+
+
+# Returns the position of the (i, j) entry in the packed lower triangle. The matrix is symmetric, so (i, j) and (j, i)
+# share one slot.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def triangular_index(i, j):
+    if i < j:
+        i, j = j, i
+    return i * (i + 1) // 2 + j
+
+
+# Writes lower-triangular rows (row i holding the distances to locations 0..i) in the packed binary format. Missing
+# cells are stored as 0. Returns the number of locations written.
+# Time complexity: O(V^2) where V is the number of vertices.
+# Space complexity: O(V) where V is the number of vertices, one row is buffered at a time.
+def write_rows_binary(rows, binary_file_path):
+    size = 0
+    with open(binary_file_path, 'wb') as binary_file:
+        binary_file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        for i, row in enumerate(rows):
+            values = array('f', row[:i + 1])
+            values.extend([0.0] * (i + 1 - len(values)))
+            if sys.byteorder == 'big':
+                values.byteswap()
+            values.tofile(binary_file)
+            size = i + 1
+
+        binary_file.seek(0)
+        binary_file.write(HEADER.pack(MAGIC, VERSION, size, 0))
+    return size
+
+
+# Converts the lower-triangular Distances.csv file into the packed binary format. Blank cells are stored as 0.
+# Returns the number of locations written.
+# Time complexity: O(V^2) where V is the number of vertices.
+# Space complexity: O(V) where V is the number of vertices.
+def convert_csv_to_binary(distances_file_path, binary_file_path):
+    with open(distances_file_path, newline='') as distance_file:
+        rows = ([float(val) if val.strip() else 0.0 for val in row] for row in csv.reader(distance_file))
+        return write_rows_binary(rows, binary_file_path)
+
+
+# Writes a full symmetric matrix (a list of rows, such as Distance.get_distance_matrix) in the packed binary format.
+# Time complexity: O(V^2) where V is the number of vertices.
+# Space complexity: O(V)
+def write_matrix_binary(matrix, binary_file_path):
+    return write_rows_binary((row[:i + 1] for i, row in enumerate(matrix)), binary_file_path)
+
+
+# Read-only distance matrix backed by a memory-mapped binary file. Loading only maps the file, so it is near instant
+# regardless of the number of locations, and the pages are shared by every process that maps the same file.
+# Space complexity: O(1) in the Python heap, the V^2 / 2 values stay in the mapped file.
+class DistanceMatrix:
+    def __init__(self, binary_file_path):
+        with open(binary_file_path, 'rb') as binary_file:
+            self._map = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, size, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{binary_file_path} is not a version {VERSION} distance matrix file")
+
+        expected_length = HEADER.size + size * (size + 1) // 2 * 4
+        if len(self._map) != expected_length:
+            self._map.close()
+            raise ValueError(f"{binary_file_path} is truncated: expected {expected_length} bytes, got {len(self._map)}")
+
+        self.size = size
+        self._values = memoryview(self._map)[HEADER.size:].cast('f') if sys.byteorder == 'little' else None
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Returns the distance between locations i and j in either orientation.
+    # Time complexity: O(1)
+    # Space complexity: O(1)
+    def distance(self, i, j):
+        if not (0 <= i < self.size and 0 <= j < self.size):
+            raise IndexError(f"Location ({i}, {j}) is outside a {self.size} location matrix")
+        position = triangular_index(i, j)
+        if self._values is not None:
+            return self._values[position]
+        return struct.unpack_from('<f', self._map, HEADER.size + position * 4)[0]
+
+    # Returns the matrix in the (i, j) keyed dictionary form produced by csvReader.read_csv_files, zeros dropped.
+    # Time complexity: O(V^2) where V is the number of vertices.
+    # Space complexity: O(V^2) where V is the number of vertices.
+    def to_distances_dict(self):
+        distances_dict = {}
+        for i in range(self.size):
+            for j in range(i + 1):
+                value = self.distance(i, j)
+                if value != 0:
+                    distances_dict[(i, j)] = value
+        return distances_dict
+
+    def close(self):
+        if self._values is not None:
+            self._values.release()
+            self._values = None
+        self._map.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python DistanceMatrix.py <Distances.csv> <output.bin>")
+        sys.exit(1)
+    locations = convert_csv_to_binary(sys.argv[1], sys.argv[2])
+    print(f"Wrote a {locations} location distance matrix to {sys.argv[2]}")
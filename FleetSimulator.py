@@ -0,0 +1,325 @@
+import datetime
+import heapq
+import logging
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from Distance import (datetime_to_seconds, find_truck_path, get_distance_matrix, get_travel_seconds_matrix,
+                      prepare_deadlines)
+from Profiler import profiler
+from Timeline import AT_HUB, DELIVERED, EN_ROUTE, to_time_string
+
+logger = logging.getLogger(__name__)
+
+# Drivers on shift, and when their shift and the day's departures start (08:00, in seconds after midnight).
+DRIVER_COUNT = 2
+DAY_START = 8 * 3600
+
+# Routing times are datetimes on the strptime base date, like the routers' times.
+BASE_DATE = datetime.datetime(1900, 1, 1)
+
+# Event kinds. Events at the same time are processed in this order, so a package that arrives at the hub, or a driver
+# who returns, at a given time can go out on a truck leaving at that time.
+PACKAGE_AVAILABLE, RETURN, HANDOFF, DEPARTURE, ARRIVAL, DELIVERY = range(6)
+EVENT_NAMES = ("package_available", "return", "handoff", "departure", "arrival", "delivery")
+
+# Events replayed at most between two state checkpoints of an EventLog; it grows to the number of packages, so the
+# checkpoints together take about as much memory as the log.
+CHECKPOINT_INTERVAL = 1024
+
+# "Delayed on flight---will not arrive to depot until 9:05 am"
+AVAILABLE_NOTE_PATTERN = re.compile(r"until (\d{1,2}):(\d{2}) ?([ap]m)", re.IGNORECASE)
+
+
+# Returns the time in seconds after midnight a package can leave the hub: the arrival time in a delayed-package note,
+# or day_start.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def get_available_seconds(package, day_start=DAY_START):
+    match = AVAILABLE_NOTE_PATTERN.search(package[8])
+    if match is None:
+        return day_start
+    hours = int(match.group(1)) % 12 + (12 if match.group(3).lower() == 'pm' else 0)
+    return max(hours * 3600 + int(match.group(2)) * 60, day_start)
+
+
+# State of the fleet at one time, as replayed from an EventLog: the status of every package (Timeline statuses, in
+# the log's package order), the location ID each truck is at or last left (-1 before it leaves) and the truck each
+# driver has (-1 for none).
+class FleetState:
+    __slots__ = ('log', 'seconds', 'package_statuses', 'truck_locations', 'driver_trucks')
+
+    def __init__(self, log, seconds, package_statuses, truck_locations, driver_trucks):
+        self.log = log
+        self.seconds = seconds
+        self.package_statuses = package_statuses
+        self.truck_locations = truck_locations
+        self.driver_trucks = driver_trucks
+
+    # Status of one package, or None for a package the log does not know.
+    # Time complexity: O(1)
+    def package_status(self, package_id):
+        position = self.log.positions.get(package_id)
+        return None if position is None else self.package_statuses[position]
+
+    # Returns the number of packages (at hub, en route, delivered).
+    # Time complexity: O(P)
+    def status_counts(self):
+        return tuple(self.package_statuses.count(status) for status in (AT_HUB, EN_ROUTE, DELIVERED))
+
+
+# Compact log of every state change of a simulated day. Each event is one entry in six typed arrays (time in seconds,
+# kind, truck index, driver, location ID, package position), appended in time order, so a time-travel query finds its
+# place with bisect and replays from the closest state checkpoint instead of from the start of the day. The packages on
+# each truck are stored once, when it leaves, and a departure moves all of them en route.
+# As in the tracker, a package is still at the hub at its truck's departure time and delivered from its delivery time.
+# Space complexity: O(E + P * E / I) for E events, P packages and a checkpoint every I events
+class EventLog:
+    def __init__(self, package_ids, truck_count, driver_count):
+        self.package_ids = list(package_ids)
+        self.positions = {package_id: position for position, package_id in enumerate(self.package_ids)}
+        self.truck_count = truck_count
+        self.driver_count = driver_count
+        self.times = array('l')
+        self.kinds = array('b')
+        self.trucks = array('l')
+        self.drivers = array('l')
+        self.locations = array('l')
+        self.packages = array('l')
+        self.truck_packages = [array('l') for _ in range(truck_count)]
+        self.checkpoint_interval = max(CHECKPOINT_INTERVAL, len(self.package_ids))
+        # (number of events applied, package statuses, truck locations, driver trucks)
+        self._checkpoints = [(0,) + self._initial_state()]
+        self._state = self._initial_state()
+
+    def _initial_state(self):
+        return (array('b', [AT_HUB]) * len(self.package_ids), array('l', [-1]) * self.truck_count,
+                array('l', [-1]) * self.driver_count)
+
+    def __len__(self):
+        return len(self.times)
+
+    # Appends one event; events must come in time order. Time complexity: O(1) amortized, O(P) at a checkpoint
+    def append(self, seconds, kind, truck=-1, driver=-1, location=-1, package=-1):
+        self.times.append(seconds)
+        self.kinds.append(kind)
+        self.trucks.append(truck)
+        self.drivers.append(driver)
+        self.locations.append(location)
+        self.packages.append(package)
+        self._apply(len(self.times) - 1, self._state)
+        if len(self.times) % self.checkpoint_interval == 0:
+            self._checkpoints.append((len(self.times),) + tuple(array(column.typecode, column)
+                                                                for column in self._state))
+
+    # Records the packages (by position) a truck leaves with, before its departure event.
+    def load(self, truck, package_positions):
+        self.truck_packages[truck] = array('l', package_positions)
+
+    def _apply(self, event, state):
+        package_statuses, truck_locations, driver_trucks = state
+        kind = self.kinds[event]
+        if kind == DEPARTURE:
+            for position in self.truck_packages[self.trucks[event]]:
+                package_statuses[position] = EN_ROUTE
+            truck_locations[self.trucks[event]] = self.locations[event]
+        elif kind == DELIVERY:
+            package_statuses[self.packages[event]] = DELIVERED
+        elif kind in (ARRIVAL, RETURN):
+            truck_locations[self.trucks[event]] = self.locations[event]
+        elif kind == HANDOFF:
+            driver_trucks[self.drivers[event]] = self.trucks[event]
+
+    # Replays the log up to the given time in seconds and returns the FleetState then.
+    # Time complexity: O(log E + P + I) where I is the checkpoint interval
+    # Space complexity: O(P + T)
+    def state_at(self, seconds):
+        before = bisect_left(self.times, seconds)
+        until = bisect_right(self.times, seconds)
+        checkpoint = self._checkpoints[before // self.checkpoint_interval]
+        applied = checkpoint[0]
+        state = tuple(array(column.typecode, column) for column in checkpoint[1:])
+        for event in range(applied, until):
+            if event >= before and self.kinds[event] == DEPARTURE:
+                continue
+            self._apply(event, state)
+        return FleetState(self, seconds, *state)
+
+    # Yields every event as (time 'HH:MM:SS', kind name, truck number or None, driver or None, location ID or None,
+    # package ID or None).
+    # Time complexity: O(E)
+    def iter_events(self):
+        for event in range(len(self.times)):
+            truck, driver = self.trucks[event], self.drivers[event]
+            location, package = self.locations[event], self.packages[event]
+            yield (to_time_string(self.times[event]), EVENT_NAMES[self.kinds[event]],
+                   truck + 1 if truck >= 0 else None, driver if driver >= 0 else None,
+                   location if location >= 0 else None, self.package_ids[package] if package >= 0 else None)
+
+
+# Departure rule of a simulated plan, with the signature of Distance.get_departure_time, for Replanner: when the routes
+# change, a run still waits for the driver of the run before it (previous_runs, None for a driver starting their
+# shift) and for its packages (ready_seconds). to_dict and from_dict keep it with a cached plan (see PlanCache).
+class DriverDepartures:
+    def __init__(self, previous_runs, ready_seconds, travel_seconds, handoff_at_last_delivery=False):
+        self.previous_runs = previous_runs
+        self.ready_seconds = ready_seconds
+        self.travel_seconds = travel_seconds
+        self.handoff_at_last_delivery = handoff_at_last_delivery
+
+    # Time complexity: O(1)
+    def __call__(self, truck_index, trucks_with_paths):
+        ready_seconds = self.ready_seconds[truck_index]
+        previous_run = self.previous_runs[truck_index]
+        if previous_run is not None:
+            route = trucks_with_paths[previous_run]
+            last_seconds = datetime_to_seconds(route['times'][-1])
+            if not self.handoff_at_last_delivery:
+                last_seconds += self.travel_seconds[route['path'][-2]][route['path'][-1]]
+            ready_seconds = max(ready_seconds, last_seconds)
+        return BASE_DATE + datetime.timedelta(seconds=ready_seconds)
+
+    def to_dict(self):
+        return {"previous_runs": list(self.previous_runs), "ready_seconds": list(self.ready_seconds),
+                "handoff_at_last_delivery": self.handoff_at_last_delivery}
+
+    @classmethod
+    def from_dict(cls, state, distances_dict):
+        return cls(state["previous_runs"], state["ready_seconds"],
+                   get_travel_seconds_matrix(get_distance_matrix(distances_dict)), state["handoff_at_last_delivery"])
+
+
+# Discrete-event simulation of a delivery day on a heapq event queue. Each allocated truck load is a run that waits at
+# the hub until a driver is free and all its packages have arrived. Drivers start their shift at day_start; when one
+# is free (a handoff), they take the waiting run that can leave first, ties to the lowest truck number, and the run is
+# routed by truck_router at its departure time. The route's stop arrivals, deliveries and return to the hub are then
+# queued, and the return frees the driver again, so fleets with more trucks than drivers go out in as many waves as
+# needed. With handoff_at_last_delivery, a driver is free at their truck's last delivery instead, as the original plan
+# assumes (Distance.get_departure_time); with three trucks and two drivers it then gives the same plan as
+# find_shortest_path.
+# run() processes the queue and returns the routes in the find_shortest_path format; every event is kept in log, and
+# departures is the plan's departure rule for Replanner.
+# Space complexity: O(E + T * P) for E events, T trucks and P packages per truck
+class FleetSimulator:
+    def __init__(self, allocated_trucks, addresses_dict, distances_dict, driver_count=DRIVER_COUNT,
+                 truck_router=find_truck_path, day_start=DAY_START, handoff_at_last_delivery=False):
+        if driver_count < 1:
+            raise ValueError(f"driver_count must be at least 1, got {driver_count}")
+        self.allocated_trucks = allocated_trucks
+        self.distances_dict = distances_dict
+        self.driver_count = driver_count
+        self.truck_router = truck_router
+        self.day_start = day_start
+        self.handoff_at_last_delivery = handoff_at_last_delivery
+        self.hub_index, self.deadlines_dict = prepare_deadlines(allocated_trucks, addresses_dict)
+        self.travel_seconds = get_travel_seconds_matrix(get_distance_matrix(distances_dict))
+
+        self.ready_seconds = [max((get_available_seconds(package, day_start) for package in truck), default=day_start)
+                              for truck in allocated_trucks]
+        # The run each truck's driver came from (None for a driver starting their shift).
+        self.previous_runs = [None] * len(allocated_trucks)
+        self.departures = DriverDepartures(self.previous_runs, self.ready_seconds, self.travel_seconds,
+                                           handoff_at_last_delivery)
+        self.trucks_with_paths = [None] * len(allocated_trucks)
+        self.log = EventLog((package[0] for truck in allocated_trucks for package in truck),
+                            len(allocated_trucks), driver_count)
+        self._queue = []
+        self._sequence = 0
+
+    # Time complexity: O(log E)
+    def _push(self, seconds, kind, truck=-1, driver=-1, location=-1, package=-1):
+        self._sequence += 1
+        heapq.heappush(self._queue, (seconds, kind, self._sequence, truck, driver, location, package))
+
+    # Runs the day and returns the routes. Every run is routed once, when it leaves.
+    # Time complexity: O(E log E) plus the routing of every run
+    # Space complexity: O(E)
+    def run(self):
+        for truck_index, truck in enumerate(self.allocated_trucks):
+            for package in truck:
+                available_seconds = get_available_seconds(package, self.day_start)
+                if available_seconds > self.day_start:
+                    self._push(available_seconds, PACKAGE_AVAILABLE, truck_index,
+                               package=self.log.positions[package[0]])
+        for driver in range(self.driver_count):
+            self._push(self.day_start, HANDOFF, driver=driver)
+
+        waiting = list(range(len(self.allocated_trucks)))
+        last_runs = [None] * self.driver_count
+        event_count = 0
+        while self._queue:
+            seconds, kind, _, truck_index, driver, location, package = heapq.heappop(self._queue)
+            event_count += 1
+            if kind == HANDOFF:
+                if not waiting:
+                    self.log.append(seconds, HANDOFF, -1, driver)
+                    continue
+                truck_index = min(waiting, key=lambda run: (max(seconds, self.ready_seconds[run]), run))
+                waiting.remove(truck_index)
+                self.previous_runs[truck_index] = last_runs[driver]
+                last_runs[driver] = truck_index
+                self.log.append(seconds, HANDOFF, truck_index, driver)
+                self._push(max(seconds, self.ready_seconds[truck_index]), DEPARTURE, truck_index, driver,
+                           self.hub_index)
+            elif kind == DEPARTURE:
+                self._depart(seconds, truck_index, driver)
+            else:
+                self.log.append(seconds, kind, truck_index, driver, location, package)
+        if profiler.enabled:
+            profiler.count('fleet_events', event_count)
+        return self.trucks_with_paths
+
+    # IDs of the packages the simulated routes leave unrouted or deliver after their deadline, in truck order.
+    # Time complexity: O(P)
+    # Space complexity: O(P)
+    def late_packages(self):
+        late_packages = []
+        for truck, route in zip(self.allocated_trucks, self.trucks_with_paths):
+            delivery_times = dict(zip(route['packages'], route['times'][1:]))
+            for package in truck:
+                delivery_time = delivery_times.get(package[0])
+                if delivery_time is None or delivery_time > self.deadlines_dict[package[0]]:
+                    late_packages.append(package[0])
+        return late_packages
+
+    # Routes a run leaving now and queues its arrivals, deliveries, return to the hub and the driver's next handoff.
+    def _depart(self, seconds, truck_index, driver):
+        route = self.truck_router(self.allocated_trucks[truck_index], BASE_DATE + datetime.timedelta(seconds=seconds),
+                                  self.hub_index, self.deadlines_dict, self.distances_dict)
+        self.trucks_with_paths[truck_index] = route
+        positions = self.log.positions
+        self.log.load(truck_index, [positions[package_id] for package_id in route['packages']])
+        self.log.append(seconds, DEPARTURE, truck_index, driver, self.hub_index)
+
+        last_location, last_seconds = self.hub_index, seconds
+        for location, time, package_id in zip(route['path'][1:-1], route['times'][1:], route['packages']):
+            arrival_seconds = datetime_to_seconds(time)
+            if location != last_location or arrival_seconds != last_seconds:
+                self._push(arrival_seconds, ARRIVAL, truck_index, driver, location)
+            self._push(arrival_seconds, DELIVERY, truck_index, driver, location, positions[package_id])
+            last_location, last_seconds = location, arrival_seconds
+        return_seconds = last_seconds + self.travel_seconds[last_location][self.hub_index]
+        self._push(return_seconds, RETURN, truck_index, driver, self.hub_index)
+        self._push(last_seconds if self.handoff_at_last_delivery else return_seconds, HANDOFF, driver=driver)
+
+
+# Runs the day with drivers handed over at the hub, and again with handoffs at the last delivery when that leaves
+# packages unrouted or late: waiting for the truck to drive back can make the next wave miss a morning deadline (with
+# two drivers, package 6 on the third truck). Returns the first simulation that delivers every package on time and
+# raises ValueError when neither does, so a late plan is never published.
+# Time complexity: O(E log E) plus the routing of every run, at most twice
+# Space complexity: O(E + T * P)
+def simulate_fleet(allocated_trucks, addresses_dict, distances_dict, driver_count=DRIVER_COUNT,
+                   truck_router=find_truck_path, day_start=DAY_START):
+    late_packages = []
+    for handoff_at_last_delivery in (False, True):
+        simulation = FleetSimulator(allocated_trucks, addresses_dict, distances_dict, driver_count, truck_router,
+                                    day_start, handoff_at_last_delivery)
+        simulation.run()
+        late_packages = simulation.late_packages()
+        if not late_packages:
+            return simulation
+        logger.info("Packages %s miss their deadline with handoff_at_last_delivery=%s", late_packages,
+                    handoff_at_last_delivery)
+    raise ValueError(f"No {driver_count}-driver day delivers every package on time; late: {late_packages}")
@@ -1,6 +1,218 @@
-# This is the Hash Table Class. It's self-adjusting, so it will rehash itself when the load factor is reached.
+from Profiler import profiler
+
+# Marker for slots that hold no entry.
+_EMPTY = object()
+
+
+# This is the Hash Table Class. It uses open addressing with linear probing over three flat parallel lists (keys,
+# cached hashes and values) instead of a list of buckets, and accepts any hashable key. remove shifts the later entries
+# of the probe run back into the freed slot (backward-shift deletion), so no tombstones are left and lookups for
+# missing keys stay as short after removals as before them.
+# Each operation runs its own probe loop inline: no helper call, tuple return or profiler check per probe. Tables built
+# while the profiler is enabled count their probes through wrappers around the operations instead (see _counted).
+# It's self-adjusting, so it will rehash itself when the load factor is reached.
 # Space Complexity: O(n), where n is the number of key-value pairs
 class HashTable:
+    def __init__(self, initial_capacity=10, load_factor=0.75):
+        self.load_factor = load_factor
+        self.size = 0
+        self._allocate(self._capacity_for(initial_capacity))
+        if profiler.enabled:
+            for name in ('insert', 'lookup', 'update', 'remove'):
+                setattr(self, name, self._counted(getattr(self, name)))
+
+    # Returns the smallest power of two that holds count entries within the load factor.
+    # Time Complexity: O(log n)
+    def _capacity_for(self, count):
+        capacity = 8
+        while count > capacity * self.load_factor:
+            capacity *= 2
+        return capacity
+
+    def _allocate(self, capacity):
+        self._keys = [_EMPTY] * capacity
+        self._hashes = [0] * capacity
+        self._values = [None] * capacity
+
+    # Wraps an operation taking the key first so every call counts its probe sequence and the slots it examines
+    # (hash_probes, hash_probe_slots) before running the operation. The probe is walked twice, so only profiled tables
+    # pay for the count.
+    def _counted(self, operation):
+        def counted(key, *args):
+            keys = self._keys
+            mask = len(keys) - 1
+            index = hash(key) & mask
+            slots = 1
+            while keys[index] is not _EMPTY and keys[index] is not key and keys[index] != key:
+                index = (index + 1) & mask
+                slots += 1
+            profiler.count('hash_probes')
+            profiler.count('hash_probe_slots', slots)
+            return operation(key, *args)
+        return counted
+
+    # This is the rehash function. It moves every entry into new lists of the given capacity, placing them directly
+    # without going through insert.
+    # Time Complexity: O(n), where n is the number of key-value pairs
+    def _rehash(self, capacity):
+        old_keys, old_hashes, old_values = self._keys, self._hashes, self._values
+        self._allocate(capacity)
+        keys, hashes, values = self._keys, self._hashes, self._values
+        mask = capacity - 1
+        for slot_key, key_hash, value in zip(old_keys, old_hashes, old_values):
+            if slot_key is _EMPTY:
+                continue
+            index = key_hash & mask
+            while keys[index] is not _EMPTY:
+                index = (index + 1) & mask
+            keys[index] = slot_key
+            hashes[index] = key_hash
+            values[index] = value
+
+    # Pre-sizes the table for count entries, so a bulk load does not rehash along the way.
+    # Time Complexity: O(n)
+    def reserve(self, count):
+        capacity = self._capacity_for(count)
+        if capacity > len(self._keys):
+            self._rehash(capacity)
+
+    # This is the insert function. It takes a key and a value and inserts them into the hash table, replacing the
+    # value of an existing key.
+    # Average Time Complexity: O(1) (amortized)
+    # Worst Time Complexity: O(n) (due to rehashing)
+    def insert(self, key, value):
+        key_hash = hash(key)
+        keys = self._keys
+        mask = len(keys) - 1
+        index = key_hash & mask
+        slot_key = keys[index]
+        while slot_key is not _EMPTY:
+            if slot_key is key or slot_key == key:
+                self._values[index] = value
+                return True
+            index = (index + 1) & mask
+            slot_key = keys[index]
+
+        if self.size + 1 > len(keys) * self.load_factor:
+            self._rehash(len(keys) * 2)
+            keys = self._keys
+            mask = len(keys) - 1
+            index = key_hash & mask
+            while keys[index] is not _EMPTY:
+                index = (index + 1) & mask
+        keys[index] = key
+        self._hashes[index] = key_hash
+        self._values[index] = value
+        self.size += 1
+        return True
+
+    # This is the lookup function. It takes a key and returns the value associated with it.
+    # Average Time Complexity: O(1)
+    # Worst Time Complexity: O(n) (due to long probe sequences)
+    def lookup(self, key):
+        keys = self._keys
+        mask = len(keys) - 1
+        index = hash(key) & mask
+        slot_key = keys[index]
+        while slot_key is not _EMPTY:
+            if slot_key is key or slot_key == key:
+                return self._values[index]
+            index = (index + 1) & mask
+            slot_key = keys[index]
+        return None
+
+    # This is the update function. It takes a key and a value and updates the value associated with the key. A missing
+    # key is inserted and False is returned.
+    # Average Time Complexity: O(1)
+    # Worst Time Complexity: O(n) (due to rehashing)
+    def update(self, key, value):
+        keys = self._keys
+        mask = len(keys) - 1
+        index = hash(key) & mask
+        slot_key = keys[index]
+        while slot_key is not _EMPTY:
+            if slot_key is key or slot_key == key:
+                self._values[index] = value
+                return True
+            index = (index + 1) & mask
+            slot_key = keys[index]
+        self.insert(key, value)
+        return False
+
+    # This is the remove function. It takes a key and removes the key-value pair from the hash table. Every later entry
+    # of the probe run whose home slot is not between the freed slot and its own slot moves back into the freed slot,
+    # which keeps every remaining key reachable from its home slot without a tombstone.
+    # Average Time Complexity: O(1)
+    # Worst Time Complexity: O(n) (due to long probe sequences)
+    def remove(self, key):
+        keys = self._keys
+        mask = len(keys) - 1
+        index = hash(key) & mask
+        slot_key = keys[index]
+        while slot_key is not key and slot_key != key:
+            if slot_key is _EMPTY:
+                return False
+            index = (index + 1) & mask
+            slot_key = keys[index]
+
+        hashes = self._hashes
+        values = self._values
+        hole = index
+        index = (index + 1) & mask
+        slot_key = keys[index]
+        while slot_key is not _EMPTY:
+            key_hash = hashes[index]
+            if (index - key_hash) & mask >= (index - hole) & mask:
+                keys[hole] = slot_key
+                hashes[hole] = key_hash
+                values[hole] = values[index]
+                hole = index
+            index = (index + 1) & mask
+            slot_key = keys[index]
+        keys[hole] = _EMPTY
+        values[hole] = None
+        self.size -= 1
+        return True
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        keys = self._keys
+        mask = len(keys) - 1
+        index = hash(key) & mask
+        slot_key = keys[index]
+        while slot_key is not _EMPTY:
+            if slot_key is key or slot_key == key:
+                return True
+            index = (index + 1) & mask
+            slot_key = keys[index]
+        return False
+
+    # Iterates over the keys in slot order.
+    # Time Complexity: O(capacity)
+    def __iter__(self):
+        for slot_key in self._keys:
+            if slot_key is not _EMPTY:
+                yield slot_key
+
+    # Iterates over the (key, value) pairs in slot order.
+    # Time Complexity: O(capacity)
+    def items(self):
+        for slot_key, value in zip(self._keys, self._values):
+            if slot_key is not _EMPTY:
+                yield slot_key, value
+
+    # Returns the values as a list.
+    # Time Complexity: O(capacity)
+    def to_list(self):
+        return [value for _, value in self.items()]
+
+
+# This is the original separate-chaining Hash Table Class, kept as the baseline for HashtableBenchmark.py. It only
+# supports keys that convert with int(). It's self-adjusting, so it will rehash itself when the load factor is reached.
+# Space Complexity: O(n), where n is the number of key-value pairs
+class ChainingHashTable:
     def __init__(self, initial_capacity=10, load_factor=0.75):
         self.map = [[] for _ in range(initial_capacity)]
         self.load_factor = load_factor
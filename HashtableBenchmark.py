@@ -0,0 +1,95 @@
+import random
+import sys
+import time
+
+from Hashtable import ChainingHashTable, HashTable
+
+
+# Thin wrapper giving the built-in dict the same insert / lookup / update / remove interface.
+class DictTable:
+    def __init__(self):
+        self.map = {}
+
+    def insert(self, key, value):
+        self.map[key] = value
+        return True
+
+    def lookup(self, key):
+        return self.map.get(key)
+
+    def update(self, key, value):
+        updated = key in self.map
+        self.map[key] = value
+        return updated
+
+    def remove(self, key):
+        return self.map.pop(key, None) is not None
+
+
+# Times one table: insert n package IDs, look all of them up in insertion order and in shuffled order, update them,
+# remove half and look everything up again. The shuffled phase is the planner's access pattern: the delivery ledger and
+# the tracker reach packages in route or request order, not in ID order.
+# Returns the seconds spent in each phase.
+# Time complexity: O(n) average for each phase.
+# Space complexity: O(n)
+def run_benchmark(table_class, keys, shuffled_keys):
+    table = table_class()
+    timings = {}
+
+    start = time.perf_counter()
+    for key in keys:
+        table.insert(key, key)
+    timings['insert'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        table.lookup(key)
+    timings['lookup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in shuffled_keys:
+        table.lookup(key)
+    timings['lookup shuffled'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        table.update(key, key)
+    timings['update'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys[::2]:
+        table.remove(key)
+    timings['remove'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        table.lookup(key)
+    timings['lookup after remove'] = time.perf_counter() - start
+    return timings
+
+
+# Compares the open-addressing HashTable with the original chaining table and the built-in dict, using string package
+# IDs like the package hash table. The tables take turns for each repeat and the best time of each phase is kept, so
+# a noisy machine does not decide the comparison.
+# Usage: python HashtableBenchmark.py [number of keys] [repeats]
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    keys = [str(package_id) for package_id in range(1, count + 1)]
+    shuffled_keys = [str(package_id) for package_id in range(1, count + 1)]
+    random.Random(0).shuffle(shuffled_keys)
+
+    tables = (('ChainingHashTable', ChainingHashTable), ('HashTable', HashTable), ('dict', DictTable))
+    results = {}
+    for _ in range(repeats):
+        for name, table_class in tables:
+            timings = run_benchmark(table_class, keys, shuffled_keys)
+            best = results.setdefault(name, timings)
+            for phase, seconds in timings.items():
+                best[phase] = min(best[phase], seconds)
+
+    phases = list(results['dict'])
+    print(f"{count} keys, best of {repeats}, seconds per phase")
+    print("Phase".ljust(22) + "".join(name.rjust(20) for name in results))
+    for phase in phases:
+        print(phase.ljust(22) + "".join(f"{results[name][phase]:.4f}".rjust(20) for name in results))
@@ -0,0 +1,98 @@
+from Distance import (build_truck_path, find_truck_path, get_distance_matrix, get_stop_deadlines, group_truck_stops,
+                      SPEED_LIMIT)
+
+# Trucks with more distinct stops than this are routed by the greedy find_truck_path instead. The DP table has
+# 2^N * N entries, so every extra stop about doubles the work: on the 300-location test network a truck takes about
+# 0.06 s at 12 stops, 0.15 s at 13, 0.26 s at 14 and 0.7 s at 15. At 13 a three-truck day stays under one second.
+HELD_KARP_MAX_STOPS = 13
+
+
+# Exact route for one truck with the Held-Karp bitmask dynamic program. The truck's packages are grouped into distinct
+# stops (location IDs) and the DP finds the stop order with the fewest shortest-path miles, including the return to the
+# hub, that meets every deadline. Since travel time is proportional to shortest-path miles, the cheapest way to reach
+# a (visited set, last stop) state is also the earliest, so states that miss a deadline can be dropped and the result
+# is provably optimal. A state is also pruned when any unvisited stop can no longer be reached by its deadline.
+# The DP and parent tables are flat lists indexed by mask * N + last, so no per-state objects are allocated.
+# The DP checks deadlines in miles, while the published arrival times are whole seconds summed leg by leg (see
+# build_truck_path), so the built route is checked again against every package deadline.
+# Trucks above max_stops stops, with no deadline-feasible order, or whose rounded times miss a deadline fall back to
+# find_truck_path.
+# Takes the same arguments as find_truck_path, start_index and deliver_late included, so it can be passed to
+# find_shortest_path as the truck_router.
+# Time complexity: O(2^N * N^2) where N is the number of distinct stops on the truck.
+# Space complexity: O(2^N * N)
+def held_karp_truck_path(truck, departure_time, hub_index, deadlines_dict, distances_dict, start_index=None,
+                         deliver_late=False, max_stops=HELD_KARP_MAX_STOPS):
+    stops, stop_packages = group_truck_stops(truck)
+
+    def fall_back():
+        return find_truck_path(truck, departure_time, hub_index, deadlines_dict, distances_dict, start_index,
+                               deliver_late)
+
+    n = len(stops)
+    if n == 0 or n > max_stops or None in stop_packages:
+        return fall_back()
+
+    distance_matrix = get_distance_matrix(distances_dict)
+    start = hub_index if start_index is None else start_index
+    # Deadlines expressed as the number of miles the truck can drive after departure before it is late.
+    limits = [(deadline - departure_time).total_seconds() / 3600 * SPEED_LIMIT
+              for deadline in get_stop_deadlines(stops, stop_packages, deadlines_dict)]
+    from_hub = [distance_matrix[start][stop] for stop in stops]
+    to_hub = [distance_matrix[stop][hub_index] for stop in stops]
+    between = [[distance_matrix[a][b] for b in stops] for a in stops]
+
+    infinity = float("inf")
+    full_mask = (1 << n) - 1
+    dp = [infinity] * ((1 << n) * n)
+    parent = [-1] * ((1 << n) * n)
+    for k in range(n):
+        if from_hub[k] <= limits[k]:
+            dp[(1 << k) * n + k] = from_hub[k]
+
+    for mask in range(1, full_mask + 1):
+        base = mask * n
+        unvisited = [k for k in range(n) if not mask & (1 << k)]
+        next_bases = [(mask | (1 << k)) * n for k in unvisited]
+        for last in range(n):
+            cost = dp[base + last]
+            if cost == infinity:
+                continue
+            row = between[last]
+            # Deadline-window pruning: every unvisited stop must still be reachable in time directly from here.
+            for k in unvisited:
+                if cost + row[k] > limits[k]:
+                    break
+            else:
+                for k, next_base in zip(unvisited, next_bases):
+                    new_cost = cost + row[k]
+                    if new_cost < dp[next_base + k]:
+                        dp[next_base + k] = new_cost
+                        parent[next_base + k] = last
+
+    best_cost = infinity
+    best_last = -1
+    base = full_mask * n
+    for last in range(n):
+        total = dp[base + last] + to_hub[last]
+        if total < best_cost:
+            best_cost = total
+            best_last = last
+
+    if best_last == -1:
+        return fall_back()
+
+    order = []
+    mask, last = full_mask, best_last
+    while last != -1:
+        order.append(stops[last])
+        previous = parent[mask * n + last]
+        mask &= ~(1 << last)
+        last = previous
+    order.reverse()
+
+    route = build_truck_path(order, stop_packages, departure_time, hub_index, distances_dict, start_index)
+    if any(arrival_time > deadlines_dict[package_id]
+           for package_id, arrival_time in zip(route['packages'], route['times'][1:])):
+        return fall_back()
+    return route
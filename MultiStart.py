@@ -0,0 +1,143 @@
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Distance import (build_truck_path, find_truck_path, get_departure_time, get_distance_matrix, get_stop_deadlines,
+                      group_truck_stops, prepare_deadlines, SPEED_LIMIT)
+from DistanceMatrix import DistanceMatrix, write_matrix_binary
+
+# Number of randomized tours built per truck, the wall-clock budget per truck in seconds, and how many of the closest
+# feasible stops each randomized step chooses from.
+MULTI_START_STARTS = 256
+MULTI_START_TIME_BUDGET = 1.0
+MULTI_START_CANDIDATES = 3
+
+# Shortest-path matrix mapped by each worker process. The matrix file is written once by the parent and every worker
+# maps the same pages, so the distance data is never pickled or copied per task.
+_worker_matrix = None
+
+
+# Pool initializer: maps the shared shortest-path matrix file in the worker process.
+def _init_worker(binary_file_path):
+    global _worker_matrix
+    _worker_matrix = DistanceMatrix(binary_file_path)
+
+
+# Builds one tour over the stops of a truck, in shortest-path miles from the hub. With rng set to None it is the
+# deterministic nearest-neighbour tour; otherwise each step picks one of the candidate_count closest stops that can
+# still be reached by their deadline, biased towards the closest. Returns (miles including the return leg, stop order),
+# or (inf, None) when the tour gets stuck with no deadline-feasible stop left.
+# Time complexity: O(N^2 log N) where N is the number of stops.
+# Space complexity: O(N)
+def construct_tour(between, from_hub, to_hub, limits, rng, candidate_count):
+    remaining = list(range(len(limits)))
+    position = -1
+    cost = 0
+    order = []
+    while remaining:
+        row = from_hub if position < 0 else between[position]
+        feasible = sorted((cost + row[k], k) for k in remaining if cost + row[k] <= limits[k])
+        if not feasible:
+            return float("inf"), None
+        if rng is None:
+            cost, position = feasible[0]
+        else:
+            cost, position = feasible[int(rng.random() ** 2 * min(candidate_count, len(feasible)))]
+        order.append(position)
+        remaining.remove(position)
+    return cost + (to_hub[position] if order else 0), order
+
+
+# Worker task: builds up to `starts` tours for one truck within time_budget seconds and returns the cheapest
+# (miles, order of stop indexes). With include_greedy set, the first tour is the deterministic nearest-neighbour tour.
+# Time complexity: O(S * N^2 log N) where S is the number of starts and N the number of stops.
+# Space complexity: O(N^2)
+def _run_starts(stops, hub_index, limits, seed, include_greedy, starts, time_budget, candidate_count):
+    matrix = _worker_matrix
+    between = [[matrix.distance(a, b) for b in stops] for a in stops]
+    from_hub = [matrix.distance(hub_index, stop) for stop in stops]
+    to_hub = [matrix.distance(stop, hub_index) for stop in stops]
+
+    rng = random.Random(seed)
+    stop_time = time.perf_counter() + time_budget
+    best = (float("inf"), None)
+    for start in range(starts):
+        if start and time.perf_counter() > stop_time:
+            break
+        tour = construct_tour(between, from_hub, to_hub, limits, None if include_greedy and start == 0 else rng,
+                              candidate_count)
+        if tour[0] < best[0]:
+            best = tour
+    return best
+
+
+# Splits the starts for one truck into one task per worker, each with its own seed. Returns the futures and the truck's
+# stop data. Trucks with an unresolved address get no tasks and are routed greedily.
+def _submit_truck(executor, workers, truck, truck_index, departure_time, hub_index, deadlines_dict, starts,
+                  time_budget, candidate_count):
+    stops, stop_packages = group_truck_stops(truck)
+    if None in stop_packages:
+        return [], stops, stop_packages
+    limits = [(deadline - departure_time).total_seconds() / 3600 * SPEED_LIMIT
+              for deadline in get_stop_deadlines(stops, stop_packages, deadlines_dict)]
+    tasks = max(1, min(workers, starts))
+    starts_per_task = -(-starts // tasks)
+    futures = [executor.submit(_run_starts, stops, hub_index, limits, truck_index * tasks + task, task == 0,
+                               starts_per_task, time_budget, candidate_count)
+               for task in range(tasks)]
+    return futures, stops, stop_packages
+
+
+# Collects the best tour of a truck and expands it to a find_truck_path style result. The tour was chosen on float32
+# distances, so it is re-timed with the exact matrix and the greedy route is used if that misses a deadline.
+def _collect_truck(futures, stops, stop_packages, truck, departure_time, hub_index, deadlines_dict, distances_dict):
+    best_cost, best_order = min((future.result() for future in futures), key=lambda result: result[0],
+                                default=(float("inf"), None))
+    if best_order is None:
+        return find_truck_path(truck, departure_time, hub_index, deadlines_dict, distances_dict)
+
+    truck_path = build_truck_path([stops[k] for k in best_order], stop_packages, departure_time, hub_index,
+                                  distances_dict)
+    for package_id, arrival_time in zip(truck_path['packages'], truck_path['times'][1:]):
+        if arrival_time > deadlines_dict[package_id]:
+            return find_truck_path(truck, departure_time, hub_index, deadlines_dict, distances_dict)
+    return truck_path
+
+
+# Planner mode that replaces find_shortest_path: for every truck it builds many randomized nearest-neighbour tours
+# in a process pool and keeps the shortest deadline-feasible one. The shortest-path matrix is written once to a
+# temporary binary file that every worker memory-maps. The trucks leaving at 08:00 are routed concurrently; the
+# later trucks depend on their last delivery times and are routed concurrently once those are known.
+# Returns the same list of {"path", "distances", "times"} dictionaries as find_shortest_path.
+# Time complexity: O(T * S * N^2 log N / W) where T is the number of trucks, S the number of starts, N the number of
+# stops per truck and W the number of workers.
+# Space complexity: O(V^2) for the shared matrix file plus O(T * P) for the results.
+def find_multi_start_paths(allocated_trucks, addresses_dict, distances_dict, starts=MULTI_START_STARTS, workers=None,
+                           time_budget=MULTI_START_TIME_BUDGET, candidate_count=MULTI_START_CANDIDATES):
+    hub_index, deadlines_dict = prepare_deadlines(allocated_trucks, addresses_dict)
+    workers = workers or os.cpu_count() or 1
+
+    file_descriptor, binary_file_path = tempfile.mkstemp(suffix='.bin')
+    os.close(file_descriptor)
+    try:
+        write_matrix_binary(get_distance_matrix(distances_dict), binary_file_path)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(binary_file_path,)) as executor:
+            trucks_with_paths = []
+            first_wave = range(min(2, len(allocated_trucks)))
+            second_wave = range(len(first_wave), len(allocated_trucks))
+            for wave in (first_wave, second_wave):
+                departure_times = [get_departure_time(truck_index, trucks_with_paths) for truck_index in wave]
+                submitted = [_submit_truck(executor, workers, allocated_trucks[truck_index], truck_index,
+                                           departure_time, hub_index, deadlines_dict, starts, time_budget,
+                                           candidate_count)
+                             for truck_index, departure_time in zip(wave, departure_times)]
+                for truck_index, departure_time, (futures, stops, stop_packages) in zip(wave, departure_times,
+                                                                                        submitted):
+                    trucks_with_paths.append(_collect_truck(futures, stops, stop_packages,
+                                                            allocated_trucks[truck_index], departure_time, hub_index,
+                                                            deadlines_dict, distances_dict))
+    finally:
+        os.remove(binary_file_path)
+    return trucks_with_paths
@@ -0,0 +1,107 @@
+import heapq
+import logging
+
+from Distance import (build_truck_path, datetime_to_seconds, get_distance_matrix, get_stop_deadlines,
+                      get_travel_seconds_matrix, group_truck_stops)
+from Profiler import profiler
+
+logger = logging.getLogger(__name__)
+
+# Length of every location's candidate list. A greedy step that finds a feasible stop among the nearest
+# NEIGHBOR_COUNT locations never looks at the rest of the truck's stops.
+NEIGHBOR_COUNT = 16
+
+# Cache of neighbor lists, keyed by the id of the shortest path matrix they were built from and the list length. The
+# matrices stay in Distance's cache, so their ids are never reused.
+_neighbor_lists_cache = {}
+
+
+# Returns, for every location, the IDs of the neighbor_count nearest locations (itself included) sorted by
+# shortest-path distance, ties by location ID, computed once per address set.
+# Time complexity: O(V^2 log k) on the first call for an address set and list length k, O(1) afterwards.
+# Space complexity: O(V * k)
+def get_neighbor_lists(distance_matrix, neighbor_count=NEIGHBOR_COUNT):
+    key = (id(distance_matrix), neighbor_count)
+    neighbor_lists = _neighbor_lists_cache.get(key)
+    if neighbor_lists is None:
+        locations = range(len(distance_matrix))
+        neighbor_lists = [tuple(heapq.nsmallest(neighbor_count, locations, key=row.__getitem__))
+                          for row in distance_matrix]
+        _neighbor_lists_cache[key] = neighbor_lists
+    return neighbor_lists
+
+
+# Greedy nearest-neighbour route for one truck that picks the same stops as Distance.find_truck_path, the closest
+# remaining stop that can still be reached by its deadline with ties to the stop whose first package comes first on the
+# truck, but finds it by walking the current location's neighbor list instead of scanning every remaining stop. The
+# remaining stops are a dictionary of {location ID: (deadline in seconds, position on the truck)}, so each neighbor is
+# checked in O(1). A neighbor list only proves a stop is the closest when it is strictly closer than the last neighbor,
+# since a location outside the list can be as close as that one; otherwise, or when no neighbor is a feasible remaining
+# stop, the step falls back to a full scan of the remaining stops.
+# Takes the same arguments as find_truck_path, deliver_late included, so it can be passed to find_shortest_path as the
+# truck_router.
+# Time complexity: O(V^2 log k + P + S * k) when the neighbor lists cover the route, up to O(P + S^2) with every step
+# falling back, where P is the number of packages on the truck, S the number of distinct stops and k the list length.
+# Space complexity: O(P)
+def neighbor_truck_path(truck, departure_time, hub_index, deadlines_dict, distances_dict, start_index=None,
+                        deliver_late=False, neighbor_count=NEIGHBOR_COUNT):
+    distance_matrix = get_distance_matrix(distances_dict)
+    travel_seconds = get_travel_seconds_matrix(distance_matrix)
+    neighbor_lists = get_neighbor_lists(distance_matrix, neighbor_count)
+    covers_all_locations = neighbor_count >= len(distance_matrix)
+    current_seconds = datetime_to_seconds(departure_time)
+
+    stops, stop_packages = group_truck_stops(truck)
+    routed_stops = [stop for stop in stops if stop is not None]
+    remaining_stops = {stop: (datetime_to_seconds(deadline), position) for position, (stop, deadline)
+                       in enumerate(zip(routed_stops, get_stop_deadlines(routed_stops, stop_packages, deadlines_dict)))}
+    stop_order = []
+    late_packages = []
+    fallback_steps = 0
+
+    last_location_index = hub_index if start_index is None else start_index
+    while remaining_stops:
+        shortest_paths = distance_matrix[last_location_index]
+        travel_row = travel_seconds[last_location_index]
+        neighbors = neighbor_lists[last_location_index]
+
+        # The first feasible neighbor is the closest; neighbors at the same distance are checked for an earlier
+        # position on the truck.
+        next_stop = None
+        for neighbor in neighbors:
+            if next_stop is not None and shortest_paths[neighbor] > next_distance:
+                break
+            remaining = remaining_stops.get(neighbor)
+            if remaining is None or current_seconds + travel_row[neighbor] > remaining[0]:
+                continue
+            if next_stop is None or remaining[1] < next_position:
+                next_stop, next_distance, next_position = neighbor, shortest_paths[neighbor], remaining[1]
+
+        if next_stop is None or (not covers_all_locations and next_distance >= shortest_paths[neighbors[-1]]):
+            fallback_steps += 1
+            candidates = [(shortest_paths[stop], position, stop) for stop, (deadline, position)
+                          in remaining_stops.items() if current_seconds + travel_row[stop] <= deadline]
+            if candidates:
+                _, _, next_stop = min(candidates)
+            elif deliver_late:
+                _, _, next_stop = min((shortest_paths[stop], position, stop)
+                                      for stop, (_, position) in remaining_stops.items())
+                late_packages.extend(stop_packages[next_stop])
+            else:
+                break
+
+        del remaining_stops[next_stop]
+        stop_order.append(next_stop)
+        current_seconds += travel_row[next_stop]
+        last_location_index = next_stop
+
+    if remaining_stops or None in stop_packages:
+        remaining_packages = [package_id for stop in sorted(remaining_stops, key=lambda stop: remaining_stops[stop][1])
+                              for package_id in stop_packages[stop]]
+        logger.warning("No next location found. Remaining packages: %s",
+                       remaining_packages + stop_packages.get(None, []))
+    if late_packages:
+        logger.warning("Packages %s will be delivered after their deadline", late_packages)
+    if profiler.enabled:
+        profiler.count('neighbor_list_fallbacks', fallback_steps)
+    return build_truck_path(stop_order, stop_packages, departure_time, hub_index, distances_dict, start_index)
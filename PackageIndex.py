@@ -0,0 +1,163 @@
+from bisect import bisect_left, insort
+
+from Timeline import AT_HUB, DELIVERED, EN_ROUTE, package_id_key, to_seconds
+
+# Deadline used for 'EOD' packages that have not been allocated yet; allocation rewrites EOD to 17:00:00.
+END_OF_DAY = 17 * 3600
+
+
+def _deadline_seconds(deadline):
+    return END_OF_DAY if deadline == "EOD" else to_seconds(deadline)
+
+
+def _sorted_ids(package_ids):
+    return sorted(package_ids, key=package_id_key)
+
+
+# Removes one (value, package ID) entry from a sorted index list.
+def _remove_sorted(index, entry):
+    position = bisect_left(index, entry)
+    if position < len(index) and index[position] == entry:
+        del index[position]
+
+
+# Secondary indexes kept next to the package hash table, so supervisors can filter packages without scanning them all:
+# - a sorted deadline index for range queries such as everything due by 10:30,
+# - hash indexes from ZIP code, location ID and truck number to package IDs,
+# - a status index: sorted departure and delivery indexes plus the set of packages that have no planned times yet,
+#   which answer "which packages are at the hub / en route / delivered at time T".
+# add() re-indexes a package from its current record, so it is called again whenever the record changes. Bulk changes
+# (building the indexes, Package.publish_delivery_ledger writing the planned times) go through add_many, which sorts
+# each sorted index once instead of inserting into it once per package.
+# Space complexity: O(n), where n is the number of packages
+class PackageIndexes:
+    def __init__(self):
+        self.deadlines = []
+        self.departures = []
+        self.deliveries = []
+        self.unscheduled = set()
+        self.by_zip = {}
+        self.by_location = {}
+        self.by_truck = {}
+        self._indexed = {}
+
+    # Builds the indexes for a list of package records.
+    # Time complexity: O(n log n)
+    @classmethod
+    def from_packages(cls, package_list):
+        indexes = cls()
+        indexes.add_many((package_info, None) for package_info in package_list)
+        return indexes
+
+    # Indexes a package record, replacing whatever was indexed for its package ID before. truck_number keeps the
+    # previously indexed truck when it is None.
+    # Time complexity: O(n) worst case for the sorted list inserts, O(log n) to find the position
+    def add(self, package_info, truck_number=None):
+        deadline, package_id, departure, delivery = self._add_entry(package_info, truck_number, True)
+        insort(self.deadlines, (deadline, package_id))
+        if departure is not None:
+            insort(self.departures, (departure, package_id))
+            insort(self.deliveries, (delivery, package_id))
+
+    # Indexes many (package record, truck number) pairs like add, then rebuilds the sorted indexes with one sort each.
+    # Time complexity: O(n log n) where n is the number of indexed packages
+    def add_many(self, packages):
+        for package_info, truck_number in packages:
+            self._add_entry(package_info, truck_number, False)
+        entries = self._indexed.items()
+        self.deadlines = sorted((entry[0], package_id) for package_id, entry in entries)
+        self.departures = sorted((entry[4], package_id) for package_id, entry in entries if entry[4] is not None)
+        self.deliveries = sorted((entry[5], package_id) for package_id, entry in entries if entry[4] is not None)
+
+    # Records a package in _indexed and the hash indexes and returns (deadline, package ID, departure, delivery) for the
+    # sorted indexes. With update_sorted False, the previous entry is left in the sorted indexes for the caller to
+    # rebuild them.
+    def _add_entry(self, package_info, truck_number, update_sorted):
+        package_id = package_info[0]
+        previous = self._indexed.get(package_id)
+        if truck_number is None and previous is not None:
+            truck_number = previous[3]
+        self._remove_entry(package_id, update_sorted)
+
+        deadline = _deadline_seconds(package_info[6])
+        departure = to_seconds(package_info[9]) if package_info[9] else None
+        delivery = to_seconds(package_info[10]) if package_info[9] else None
+        self._indexed[package_id] = (deadline, package_info[5], package_info[1], truck_number, departure, delivery)
+
+        self.by_zip.setdefault(package_info[5], set()).add(package_id)
+        self.by_location.setdefault(package_info[1], set()).add(package_id)
+        if truck_number is not None:
+            self.by_truck.setdefault(truck_number, set()).add(package_id)
+        if departure is None:
+            self.unscheduled.add(package_id)
+        return deadline, package_id, departure, delivery
+
+    # Drops a package from every index. Returns False if it was not indexed.
+    # Time complexity: O(n) worst case for the sorted list deletes
+    def remove(self, package_id):
+        return self._remove_entry(package_id, True)
+
+    def _remove_entry(self, package_id, update_sorted):
+        entry = self._indexed.pop(package_id, None)
+        if entry is None:
+            return False
+        deadline, zip_code, location_index, truck_number, departure, delivery = entry
+        self.by_zip[zip_code].discard(package_id)
+        self.by_location[location_index].discard(package_id)
+        if truck_number is not None:
+            self.by_truck[truck_number].discard(package_id)
+        if departure is None:
+            self.unscheduled.discard(package_id)
+        if update_sorted:
+            _remove_sorted(self.deadlines, (deadline, package_id))
+            if departure is not None:
+                _remove_sorted(self.departures, (departure, package_id))
+                _remove_sorted(self.deliveries, (delivery, package_id))
+        return True
+
+    def __len__(self):
+        return len(self._indexed)
+
+    # Returns the IDs of the packages with a deadline between start and end seconds (inclusive), earliest first.
+    # Time complexity: O(log n + k) where k is the number of packages returned
+    def due_between(self, start, end):
+        low = bisect_left(self.deadlines, (start,))
+        high = bisect_left(self.deadlines, (end + 1,))
+        return [package_id for _, package_id in self.deadlines[low:high]]
+
+    # Returns the IDs of the packages due by the given time in seconds, earliest first.
+    # Time complexity: O(log n + k)
+    def due_by(self, seconds):
+        return self.due_between(0, seconds)
+
+    # Time complexity: O(k log k) where k is the number of packages returned
+    def with_zip(self, zip_code):
+        return _sorted_ids(self.by_zip.get(zip_code, ()))
+
+    # Time complexity: O(k log k)
+    def at_location(self, location_index):
+        return _sorted_ids(self.by_location.get(location_index, ()))
+
+    # Time complexity: O(k log k)
+    def on_truck(self, truck_number):
+        return _sorted_ids(self.by_truck.get(truck_number, ()))
+
+    # Returns the IDs of the packages with the given status (Timeline.AT_HUB, EN_ROUTE or DELIVERED) at the given time
+    # in seconds, using the same rules as the tracker: a package is at the hub until its truck leaves, and delivered
+    # from its delivery time on. Packages without planned times are at the hub.
+    # Time complexity: O(log n + k log k) where k is the number of packages returned
+    def with_status(self, status, seconds):
+        departed = bisect_left(self.departures, (seconds,))
+        delivered = bisect_left(self.deliveries, (seconds + 1,))
+        if status == DELIVERED:
+            package_ids = [package_id for _, package_id in self.deliveries[:delivered]]
+        elif status == EN_ROUTE:
+            delivered_ids = {package_id for _, package_id in self.deliveries[:delivered]}
+            package_ids = [package_id for _, package_id in self.departures[:departed]
+                           if package_id not in delivered_ids]
+        elif status == AT_HUB:
+            package_ids = [package_id for _, package_id in self.departures[departed:]]
+            package_ids.extend(self.unscheduled)
+        else:
+            raise ValueError(f"Unknown package status: {status}")
+        return _sorted_ids(package_ids)
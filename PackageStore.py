@@ -0,0 +1,265 @@
+from array import array
+from enum import IntEnum
+
+from Distance import datetime_to_seconds
+from PackageIndex import END_OF_DAY
+from Timeline import AT_HUB, DELIVERED, EN_ROUTE, NOT_SCHEDULED, STATUS_NAMES, to_seconds, to_time_string
+from csvReader import iter_packages
+
+# Stands for a package whose address did not resolve to a location ID (None in a package record).
+NO_LOCATION = -1
+
+
+# Package statuses, with the same values as the Timeline constants.
+class Status(IntEnum):
+    AT_HUB = AT_HUB
+    EN_ROUTE = EN_ROUTE
+    DELIVERED = DELIVERED
+
+    # The status as shown by the tracker.
+    @property
+    def label(self):
+        return STATUS_NAMES[self]
+
+
+# Interns strings into integer codes, so a column stores one code per package and every distinct string once.
+# Space complexity: O(D) where D is the number of distinct strings
+class StringPool:
+    def __init__(self):
+        self.codes = {}
+        self.strings = []
+
+    # Time complexity: O(1)
+    def intern(self, string):
+        code = self.codes.get(string)
+        if code is None:
+            code = self.codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+    def __len__(self):
+        return len(self.strings)
+
+
+# Struct-of-arrays package store. Every field of the package records is a column: location IDs, deadlines and planned
+# times in integer seconds and truck numbers are typed arrays, and the address, city, state, ZIP, weight and note
+# columns hold codes into one StringPool, so a day with many packages to the same places keeps each string once.
+# Package IDs are the only per-package objects. Records are read through Package views, which hold just the store and
+# a row number, and whole columns through column(), which returns a read-only memoryview of the array.
+# Deadlines are kept in seconds, so an 'EOD' deadline reads back as '17:00:00', as allocation rewrites it.
+# Space complexity: O(P + D) where P is the number of packages and D the number of distinct strings
+class PackageStore:
+    STRING_COLUMNS = ('address', 'city', 'state', 'zip', 'weight', 'note')
+    COLUMNS = ('location', 'deadline', 'departure', 'delivery', 'truck') + STRING_COLUMNS
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.ids = []
+        self.rows = {}
+        self.location = array('l')
+        self.deadline = array('l')
+        self.departure = array('l')
+        self.delivery = array('l')
+        self.truck = array('l')
+        for name in self.STRING_COLUMNS:
+            setattr(self, name, array('l'))
+
+    # Builds a store from package records, such as the values of the published package hash table.
+    # Time complexity: O(P)
+    @classmethod
+    def from_packages(cls, packages):
+        store = cls()
+        for package_info in packages:
+            store.append(package_info)
+        return store
+
+    # Loads a packages.csv file straight into a store; each parsed record is dropped once its fields are stored.
+    # Time complexity: O(P)
+    @classmethod
+    def from_csv(cls, packages_file_path, address_index):
+        return cls.from_packages(iter_packages(packages_file_path, address_index))
+
+    # Appends one package record (see csvReader.parse_package_row) and returns its row. Raises ValueError for a
+    # package ID that is already stored.
+    # Time complexity: O(1) amortized
+    def append(self, package_info, truck_number=0):
+        package_id = package_info[0]
+        if package_id in self.rows:
+            raise ValueError(f"Package {package_id} is already in the store")
+        row = self.rows[package_id] = len(self.ids)
+        self.ids.append(package_id)
+        self.location.append(NO_LOCATION if package_info[1] is None else package_info[1])
+        self.deadline.append(END_OF_DAY if package_info[6] == "EOD" else to_seconds(package_info[6]))
+        self.departure.append(to_seconds(package_info[9]) if package_info[9] else NOT_SCHEDULED)
+        # An unrouted package keeps 'At the hub' in its delivery field, so its departure decides.
+        self.delivery.append(to_seconds(package_info[10]) if package_info[9] else NOT_SCHEDULED)
+        self.truck.append(truck_number)
+        intern = self.strings.intern
+        for name, value in zip(self.STRING_COLUMNS, package_info[2:6] + package_info[7:9]):
+            getattr(self, name).append(intern(value))
+        return row
+
+    # Writes a delivery ledger (see Distance.get_delivery_ledger) into the departure, delivery and truck columns, the
+    # columnar form of Package.publish_delivery_ledger. Packages that are not stored are skipped.
+    # Time complexity: O(L) where L is the number of ledger entries
+    def publish(self, ledger):
+        for package_id, truck_number, _, departure_time, arrival_time in ledger:
+            row = self.rows.get(package_id)
+            if row is not None:
+                self.departure[row] = datetime_to_seconds(departure_time)
+                self.delivery[row] = datetime_to_seconds(arrival_time)
+                self.truck[row] = truck_number
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, package_id):
+        return package_id in self.rows
+
+    # Returns the view of a package, or None for an unknown package ID.
+    # Time complexity: O(1)
+    def get(self, package_id):
+        row = self.rows.get(package_id)
+        return None if row is None else Package(self, row)
+
+    # Yields a view of every package in row order.
+    def __iter__(self):
+        for row in range(len(self.ids)):
+            yield Package(self, row)
+
+    # Returns a read-only memoryview of one column, without copying it.
+    # Time complexity: O(1)
+    def column(self, name):
+        if name not in self.COLUMNS:
+            raise KeyError(f"unknown column {name!r}")
+        return memoryview(getattr(self, name)).toreadonly()
+
+    # Status of the package in a row at the given time in seconds, by the tracker's rules: at the hub until its truck
+    # leaves, en route until it is delivered and delivered from its delivery time on.
+    # Time complexity: O(1)
+    def status(self, row, seconds):
+        if self.departure[row] >= seconds:
+            return Status.AT_HUB
+        if seconds < self.delivery[row]:
+            return Status.EN_ROUTE
+        return Status.DELIVERED
+
+    # Returns the number of packages (at hub, en route, delivered) at the given time with one pass over the typed
+    # departure and delivery columns.
+    # Time complexity: O(P)
+    def status_counts(self, seconds):
+        at_hub = sum(1 for departure in self.departure if departure >= seconds)
+        delivered = sum(1 for delivery in self.delivery if delivery <= seconds)
+        return at_hub, len(self.ids) - at_hub - delivered, delivered
+
+    # Returns the rows of the packages with a deadline at or before the given time in seconds.
+    # Time complexity: O(P)
+    def rows_due_by(self, seconds):
+        return [row for row, deadline in enumerate(self.deadline) if deadline <= seconds]
+
+
+# Read view of one package in a PackageStore: two references and no copy of the fields, which are read from the
+# columns on access. It also answers the positional indexes of a package record (see csvReader.parse_package_row),
+# so code that reads records, such as Replanner.package_at_time, can be given a view instead.
+class Package:
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def _string(self, column):
+        return self.store.strings.strings[getattr(self.store, column)[self.row]]
+
+    @property
+    def id(self):
+        return self.store.ids[self.row]
+
+    @property
+    def location_index(self):
+        location = self.store.location[self.row]
+        return None if location == NO_LOCATION else location
+
+    @property
+    def address(self):
+        return self._string('address')
+
+    @property
+    def city(self):
+        return self._string('city')
+
+    @property
+    def state(self):
+        return self._string('state')
+
+    @property
+    def zip(self):
+        return self._string('zip')
+
+    @property
+    def weight(self):
+        return self._string('weight')
+
+    @property
+    def note(self):
+        return self._string('note')
+
+    @property
+    def deadline_seconds(self):
+        return self.store.deadline[self.row]
+
+    @property
+    def departure_seconds(self):
+        return self.store.departure[self.row]
+
+    @property
+    def delivery_seconds(self):
+        return self.store.delivery[self.row]
+
+    @property
+    def truck_number(self):
+        return self.store.truck[self.row] or None
+
+    def status_at(self, seconds):
+        return self.store.status(self.row, seconds)
+
+    # The package as a record list, in the csvReader.parse_package_row layout.
+    # Time complexity: O(1)
+    def to_list(self):
+        departure = self.departure_seconds
+        scheduled = departure != NOT_SCHEDULED
+        return [self.id, self.location_index, self.address, self.city, self.state, self.zip,
+                to_time_string(self.deadline_seconds), self.weight, self.note,
+                to_time_string(departure) if scheduled else '',
+                to_time_string(self.delivery_seconds) if scheduled else 'At the hub']
+
+    def __getitem__(self, position):
+        return _RECORD_FIELDS[position](self)
+
+    def __len__(self):
+        return len(_RECORD_FIELDS)
+
+    def __eq__(self, other):
+        return isinstance(other, Package) and self.store is other.store and self.row == other.row
+
+    def __hash__(self):
+        return hash((id(self.store), self.row))
+
+    def __repr__(self):
+        return f"Package({self.to_list()!r})"
+
+
+# Reads one field of a view by its position in a package record.
+_RECORD_FIELDS = (
+    lambda package: package.id,
+    lambda package: package.location_index,
+    lambda package: package.address,
+    lambda package: package.city,
+    lambda package: package.state,
+    lambda package: package.zip,
+    lambda package: to_time_string(package.deadline_seconds),
+    lambda package: package.weight,
+    lambda package: package.note,
+    lambda package: package.to_list()[9],
+    lambda package: package.to_list()[10],
+)
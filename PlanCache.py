@@ -0,0 +1,102 @@
+import datetime
+import hashlib
+import json
+import os
+import struct
+import zlib
+
+# File layout: magic, format version and the SHA-256 of the payload, followed by the zlib-compressed JSON payload.
+MAGIC = b'WGPC'
+VERSION = 4
+HEADER = struct.Struct('<4sI32s')
+
+# Routing times are datetimes on the strptime base date (1900-01-01); they are stored as microseconds after midnight.
+BASE_DATE = datetime.datetime(1900, 1, 1)
+
+
+# Returns the cache key of a plan: a SHA-256 over the contents of the input files and the planner settings, so that
+# changing any input byte or setting selects a different cache entry.
+# Time complexity: O(n) where n is the total size of the input files.
+# Space complexity: O(1)
+def get_cache_key(file_paths, settings):
+    digest = hashlib.sha256()
+    digest.update(f"plan-cache-v{VERSION}".encode())
+    for file_path in file_paths:
+        with open(file_path, 'rb') as input_file:
+            file_digest = hashlib.sha256(input_file.read()).digest()
+        digest.update(file_digest)
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _to_microseconds(time):
+    return (time - BASE_DATE) // datetime.timedelta(microseconds=1)
+
+
+def _from_microseconds(microseconds):
+    return BASE_DATE + datetime.timedelta(microseconds=microseconds)
+
+
+# Saves a published plan: every package record (including the times written at publish), the package IDs on each
+# truck, each truck's path, distances, times and delivered package IDs, and the records packages had before their
+# address corrections (see Replanner.package_history). plan_state holds what a Replanner needs to continue from the
+# plan: {"version", "seconds", "held_packages", "departures"}, where departures is a FleetSimulator.DriverDepartures
+# dict or None for the default departure rule. The file is written to a temporary name and renamed into
+# place, so a crash never leaves a half-written entry behind.
+# Time complexity: O(P + T * N) where P is the number of packages, T the number of trucks and N the stops per truck.
+# Space complexity: O(P + T * N)
+def save_plan(cache_file_path, package_list, allocated_trucks, trucks_with_paths, package_history=None,
+              plan_state=None):
+    payload = {
+        "packages": package_list,
+        "trucks": [[package_info[0] for package_info in truck] for truck in allocated_trucks],
+        "paths": [{"path": truck["path"], "distances": truck["distances"],
+                   "times": [_to_microseconds(time) for time in truck["times"]], "packages": truck["packages"]}
+                  for truck in trucks_with_paths],
+        "history": package_history or {},
+        "state": plan_state or {},
+    }
+    data = zlib.compress(json.dumps(payload, separators=(',', ':')).encode())
+
+    os.makedirs(os.path.dirname(cache_file_path) or '.', exist_ok=True)
+    temporary_file_path = f"{cache_file_path}.{os.getpid()}.tmp"
+    with open(temporary_file_path, 'wb') as cache_file:
+        cache_file.write(HEADER.pack(MAGIC, VERSION, hashlib.sha256(data).digest()))
+        cache_file.write(data)
+    os.replace(temporary_file_path, cache_file_path)
+
+
+# Loads a plan saved by save_plan. Returns (package_list, allocated_trucks, trucks_with_paths, package_history,
+# plan_state), with the truck lists holding the same package records as package_list, or None when there is no entry.
+# Entries with a bad header, a checksum mismatch or an unreadable payload are deleted and reported as missing, so the
+# plan is rebuilt.
+# Time complexity: O(P + T * N)
+# Space complexity: O(P + T * N)
+def load_plan(cache_file_path):
+    try:
+        with open(cache_file_path, 'rb') as cache_file:
+            header = cache_file.read(HEADER.size)
+            data = cache_file.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        magic, version, checksum = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or hashlib.sha256(data).digest() != checksum:
+            raise ValueError("stale or corrupted plan cache entry")
+        payload = json.loads(zlib.decompress(data))
+
+        package_list = payload["packages"]
+        packages_by_id = {package_info[0]: package_info for package_info in package_list}
+        allocated_trucks = [[packages_by_id[package_id] for package_id in truck] for truck in payload["trucks"]]
+        trucks_with_paths = [{"path": truck["path"], "distances": truck["distances"],
+                              "times": [_from_microseconds(time) for time in truck["times"]],
+                              "packages": truck["packages"]}
+                             for truck in payload["paths"]]
+        package_history = {package_id: [(seconds, package_info) for seconds, package_info in history]
+                           for package_id, history in payload["history"].items()}
+        plan_state = payload["state"]
+    except (ValueError, KeyError, TypeError, struct.error, zlib.error):
+        os.remove(cache_file_path)
+        return None
+    return package_list, allocated_trucks, trucks_with_paths, package_history, plan_state
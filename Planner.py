@@ -0,0 +1,298 @@
+import os
+from functools import cached_property
+
+from Allocation import allocate_packages_to_trucks, LATE_TRUCK_INDEX, TRUCK_CAPACITY, TRUCK_COUNT
+from Distance import (find_shortest_path, find_truck_path, get_delivery_ledger, get_departure_time, get_distances,
+                      prepare_deadlines)
+from FleetSimulator import DriverDepartures, simulate_fleet
+from MultiStart import find_multi_start_paths
+from Package import publish_delivery_ledger
+from PackageIndex import PackageIndexes
+from PlanCache import get_cache_key, load_plan, save_plan
+from Profiler import profiler
+from Replanner import AddressCorrection, get_held_packages, Replanner
+from RouteImprovement import improve_route, improve_routes
+from Timeline import StatusTimeline, to_seconds
+from csvReader import build_address_index, build_package_hash_table, read_csv_files, read_packages
+
+ADDRESSES_FILE_PATH = 'CSV/Addresses.csv'
+DISTANCES_FILE_PATH = 'CSV/Distances.csv'
+PACKAGES_FILE_PATH = 'CSV/Packages.csv'
+PLAN_CACHE_DIRECTORY = '.plan_cache'
+
+# Changes announced for the day: package 9's address is corrected at 10:20.
+DAY_EVENTS = (AddressCorrection('10:20:00', '9', '410 S State St', 'Salt Lake City', 'UT', '84111'),)
+
+
+# The delivery plan for one day. Creating a Planner does no work: each stage (loading the CSV files, allocation,
+# routing, publishing the times to the package hash table, the status timeline) runs the first time it, or a later
+# stage, is asked for, and its result is kept for the following calls. Each stage is timed by Profiler.profiler when
+# profiling is enabled.
+# Settings:
+# - truck_count / truck_capacity: fleet size and packages per truck.
+# - truck_router: per-truck router for find_shortest_path (find_truck_path, HeldKarp.held_karp_truck_path or
+#   NeighborLists.neighbor_truck_path).
+# - multi_start: route with MultiStart.find_multi_start_paths instead of truck_router.
+# - driver_count: route with a FleetSimulator run with that many drivers instead of the fixed departures of
+#   find_shortest_path (FleetSimulator.simulate_fleet, which raises ValueError when no simulated day is on time);
+#   the simulation is kept in fleet_simulation, with its event log. The plan cache keeps the
+#   simulated departures but not the log, so fleet_simulation is None on a cache hit. driver_count cannot be combined
+#   with multi_start or improve_routes, which do not go through the simulation.
+# - improve_routes: run the 2-opt / Or-opt pass, bounded by improve_time_budget seconds and improve_max_iterations.
+# - events: mid-day events applied after routing by Replanner, each publishing a new plan version. Packages waiting for
+#   an address correction are loaded but not routed until it arrives. apply_event adds events after planning.
+# - cache_directory: where published plans are cached, keyed by a hash of the three input files and the settings above
+#   (see PlanCache). A restart with unchanged inputs loads the plan instead of recomputing it. None disables the cache.
+# - network: an (addresses_dict, distances_dict) pair already read from the two network files, shared by planners of
+#   many manifests over the same address network (see BatchPlanner) instead of reading the files again.
+class Planner:
+    def __init__(self, addresses_file_path=ADDRESSES_FILE_PATH, distances_file_path=DISTANCES_FILE_PATH,
+                 packages_file_path=PACKAGES_FILE_PATH, truck_count=TRUCK_COUNT, truck_capacity=TRUCK_CAPACITY,
+                 truck_router=find_truck_path, multi_start=False, improve_routes=False, improve_time_budget=0.5,
+                 improve_max_iterations=1000, events=DAY_EVENTS, cache_directory=None, network=None,
+                 driver_count=None):
+        if driver_count is not None and (multi_start or improve_routes):
+            raise ValueError("driver_count cannot be combined with multi_start or improve_routes")
+        self.addresses_file_path = addresses_file_path
+        self.distances_file_path = distances_file_path
+        self.packages_file_path = packages_file_path
+        self.truck_count = truck_count
+        self.truck_capacity = truck_capacity
+        self.truck_router = truck_router
+        self.multi_start = multi_start
+        self.improve_routes = improve_routes
+        self.improve_time_budget = improve_time_budget
+        self.improve_max_iterations = improve_max_iterations
+        self.events = tuple(events)
+        self.cache_directory = cache_directory
+        self.network = network
+        self.driver_count = driver_count
+        self.fleet_simulation = None
+
+    @cached_property
+    def _addresses_and_distances(self):
+        if self.network is not None:
+            return self.network
+        with profiler.stage('read_csv_files'):
+            return read_csv_files(self.addresses_file_path, self.distances_file_path)
+
+    @property
+    def addresses_dict(self):
+        return self._addresses_and_distances[0]
+
+    @property
+    def distances_dict(self):
+        return self._addresses_and_distances[1]
+
+    @cached_property
+    def address_index(self):
+        return build_address_index(self.addresses_dict)
+
+    # Settings that change the plan, as part of the cache key.
+    def _settings(self):
+        router_name = getattr(self.truck_router, '__qualname__', repr(self.truck_router))
+        return {"truck_count": self.truck_count, "truck_capacity": self.truck_capacity,
+                "truck_router": f"{self.truck_router.__module__}.{router_name}",
+                "multi_start": self.multi_start, "improve_routes": self.improve_routes,
+                "improve_time_budget": self.improve_time_budget, "improve_max_iterations": self.improve_max_iterations,
+                "events": list(self.events), "driver_count": self.driver_count}
+
+    @cached_property
+    def cache_file_path(self):
+        if self.cache_directory is None:
+            return None
+        cache_key = get_cache_key([self.addresses_file_path, self.distances_file_path, self.packages_file_path],
+                                  self._settings())
+        return os.path.join(self.cache_directory, f"{cache_key}.plan")
+
+    # (package_list, allocated_trucks, trucks_with_paths, package_history, plan_state) from the plan cache, or None on a
+    # miss.
+    @cached_property
+    def _cached_plan(self):
+        if self.cache_file_path is None:
+            return None
+        with profiler.stage('load_cached_plan'):
+            return load_plan(self.cache_file_path)
+
+    @cached_property
+    def _packages(self):
+        if self._cached_plan is not None:
+            package_list = self._cached_plan[0]
+            return build_package_hash_table(package_list), package_list
+        address_index = self.address_index
+        with profiler.stage('read_packages'):
+            return read_packages(self.packages_file_path, address_index)
+
+    # The package hash table as loaded (or as cached). Use published_packages to get it with the planned times.
+    @property
+    def package_hash_table(self):
+        return self._packages[0]
+
+    @property
+    def package_list(self):
+        return self._packages[1]
+
+    # Secondary indexes (deadline, ZIP, location, truck, status) over the package records, kept in step with the hash
+    # table: published_packages re-indexes every package when it writes the planned times.
+    @cached_property
+    def package_indexes(self):
+        return PackageIndexes.from_packages(self.package_list)
+
+    # Lists of packages allocated to each truck. On a cache hit these are the trucks of the last plan version.
+    @cached_property
+    def allocated_trucks(self):
+        if self._cached_plan is not None:
+            return self._cached_plan[1]
+        package_list = self.package_list
+        with profiler.stage('allocate_packages_to_trucks'):
+            return allocate_packages_to_trucks(package_list, self.truck_count, self.truck_capacity)
+
+    # Replanner holding every plan version: the routed plan, then one version per event. The routers only see the
+    # packages that are not held back for an address correction. On a cache hit the cached plan is the first version,
+    # with the version number, time, held packages and departure rule it was saved with.
+    @cached_property
+    def replanner(self):
+        allocated_trucks = self.allocated_trucks
+        if self._cached_plan is not None:
+            _, _, trucks_with_paths, package_history, plan_state = self._cached_plan
+            departure_rule = get_departure_time
+            if plan_state["departures"] is not None:
+                departure_rule = DriverDepartures.from_dict(plan_state["departures"], self.distances_dict)
+            return Replanner(allocated_trucks, trucks_with_paths, self.addresses_dict, self.distances_dict,
+                             self.truck_capacity, plan_state["held_packages"], package_history, departure_rule,
+                             plan_state["version"], plan_state["seconds"], self.truck_router)
+
+        held_packages = get_held_packages(self.events)
+        routed_trucks = [[package for package in truck if package[0] not in held_packages]
+                         for truck in allocated_trucks]
+        departure_rule = get_departure_time
+        if self.driver_count is not None:
+            with profiler.stage('simulate_fleet'):
+                self.fleet_simulation = simulate_fleet(routed_trucks, self.addresses_dict, self.distances_dict,
+                                                       self.driver_count, self.truck_router)
+                trucks_with_paths = self.fleet_simulation.trucks_with_paths
+            departure_rule = self.fleet_simulation.departures
+        else:
+            with profiler.stage('find_shortest_path'):
+                if self.multi_start:
+                    trucks_with_paths = find_multi_start_paths(routed_trucks, self.addresses_dict,
+                                                               self.distances_dict)
+                else:
+                    trucks_with_paths = find_shortest_path(routed_trucks, self.addresses_dict, self.distances_dict,
+                                                           self.truck_router)
+        if self.improve_routes:
+            with profiler.stage('improve_routes'):
+                trucks_with_paths = self._improve(trucks_with_paths, routed_trucks)
+
+        replanner = Replanner(allocated_trucks, trucks_with_paths, self.addresses_dict, self.distances_dict,
+                              self.truck_capacity, held_packages, departure_rule=departure_rule,
+                              truck_router=self.truck_router)
+        with profiler.stage('replan'):
+            for event in sorted(self.events, key=lambda event: to_seconds(event.time)):
+                replanner.apply(event)
+        return replanner
+
+    # Improves every route, then moves the departure of each later truck to when the improved first-wave trucks now
+    # finish (get_departure_time), routing and improving that truck again from its new departure. The later trucks'
+    # departures only depend on the first wave, so one pass is enough.
+    def _improve(self, trucks_with_paths, routed_trucks):
+        trucks_with_paths = improve_routes(trucks_with_paths, routed_trucks, self.distances_dict,
+                                           self.improve_time_budget, self.improve_max_iterations)
+        hub_index, deadlines_dict = prepare_deadlines(routed_trucks, self.addresses_dict)
+        truck_budget = self.improve_time_budget / max(len(trucks_with_paths), 1)
+        for truck_index in range(LATE_TRUCK_INDEX, len(trucks_with_paths)):
+            departure_time = get_departure_time(truck_index, trucks_with_paths)
+            if departure_time == trucks_with_paths[truck_index]['times'][0]:
+                continue
+            route = self.truck_router(routed_trucks[truck_index], departure_time, hub_index, deadlines_dict,
+                                     self.distances_dict)
+            trucks_with_paths[truck_index] = improve_route(route, routed_trucks[truck_index], self.distances_dict,
+                                                           truck_budget, self.improve_max_iterations)
+        return trucks_with_paths
+
+    # Path, leg distances and arrival times of every truck in the current plan version.
+    @cached_property
+    def trucks_with_paths(self):
+        if self._cached_plan is not None and 'replanner' not in self.__dict__:
+            return self._cached_plan[2]
+        return self.replanner.current.trucks_with_paths
+
+    # {package ID: [(seconds, record before the correction at that time), ...]}, for showing a package as it stood at a
+    # given time (Replanner.package_at_time).
+    @cached_property
+    def package_history(self):
+        if self._cached_plan is not None and 'replanner' not in self.__dict__:
+            return self._cached_plan[3]
+        return self.replanner.package_history
+
+    # (mileage of each truck, total mileage), summed once from the routes.
+    @cached_property
+    def truck_distances(self):
+        return get_distances(self.trucks_with_paths)
+
+    # The package hash table with the departure and delivery time of every package written to it.
+    @cached_property
+    def published_packages(self):
+        if self._cached_plan is not None:
+            self.package_indexes.add_many((package, truck_number) for truck_number, truck_packages
+                                          in enumerate(self.allocated_trucks, start=1) for package in truck_packages)
+            return self.package_hash_table
+        version = self.replanner.current
+        with profiler.stage('publish'):
+            self._publish(version)
+        if self.cache_file_path is not None:
+            with profiler.stage('save_plan'):
+                departure_rule = self.replanner.departure_rule
+                plan_state = {"version": version.version, "seconds": version.seconds,
+                              "held_packages": sorted(version.held_packages),
+                              "departures": departure_rule.to_dict()
+                              if isinstance(departure_rule, DriverDepartures) else None}
+                save_plan(self.cache_file_path, self.package_hash_table.to_list(), version.trucks,
+                          version.trucks_with_paths, self.package_history, plan_state)
+        return self.package_hash_table
+
+    # Writes the package records a plan version changed (corrected or late packages) and the times from its delivery
+    # ledger to the package hash table and indexes. A package that is no longer routed goes back to 'At the hub'; that
+    # only happens on a truck still at the hub, since Replanner delivers late rather than drop a package on the road.
+    # Time complexity: O(P) for P packages on the trucks
+    def _publish(self, version):
+        package_hash_table = self.package_hash_table
+        package_indexes = self.package_indexes
+        ledger = get_delivery_ledger(version.trucks_with_paths)
+        routed_packages = {record[0] for record in ledger}
+        changed = []
+        for truck_number, truck_packages in enumerate(version.trucks, start=1):
+            for package in truck_packages:
+                if package[0] not in routed_packages and package[9]:
+                    package[9], package[10] = '', 'At the hub'
+                elif package_hash_table.lookup(package[0]) is package:
+                    continue
+                package_hash_table.update(package[0], package)
+                changed.append((package, truck_number))
+        if changed:
+            package_indexes.add_many(changed)
+        publish_delivery_ledger(ledger, package_hash_table, package_indexes)
+
+    # Applies a mid-day event (see Replanner) to the published plan: only the trucks it affects are re-routed, and the
+    # new version is published at once. The routes, mileage and status timeline follow the new version on next use.
+    # Returns the new PlanVersion. The plan cache keeps the plan for the events given to the constructor.
+    def apply_event(self, event):
+        _ = self.published_packages
+        version = self.replanner.apply(event)
+        self.events = self.events + (event,)
+        with profiler.stage('publish'):
+            self._publish(version)
+        for name in ('trucks_with_paths', 'truck_distances', 'status_timeline'):
+            self.__dict__.pop(name, None)
+        return version
+
+    @cached_property
+    def status_timeline(self):
+        published_packages = self.published_packages
+        with profiler.stage('status_timeline'):
+            return StatusTimeline.from_hash_table(published_packages)
+
+    # Runs every stage now instead of on first use, and returns the planner.
+    def plan(self):
+        _ = self.status_timeline
+        return self
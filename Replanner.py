@@ -0,0 +1,262 @@
+import datetime
+import logging
+from collections import namedtuple
+
+from Allocation import get_required_truck, LATE_TRUCK_INDEX, TRUCK_CAPACITY
+from Distance import (datetime_to_seconds, find_location_index_by_address, find_truck_path, get_departure_time,
+                      get_distance_matrix, get_travel_seconds_matrix, HUB_ADDRESS)
+from Timeline import to_seconds
+from csvReader import build_address_index
+
+logger = logging.getLogger(__name__)
+
+# Mid-day events handled by Replanner. Times are 'HH:MM:SS' or 'HH:MM' strings, like the deadlines in Packages.csv.
+# - AddressCorrection: the address of a package is corrected. A package waiting for a known correction is loaded on its
+#   truck but not routed until the correction arrives (see get_held_packages).
+# - LatePackage: a package record, as built by csvReader.parse_package_row, arrives at the hub.
+# - TruckDelay: a truck is held up for the given number of seconds.
+AddressCorrection = namedtuple('AddressCorrection', ['time', 'package_id', 'address', 'city', 'state', 'zip'])
+LatePackage = namedtuple('LatePackage', ['time', 'package_info'])
+TruckDelay = namedtuple('TruckDelay', ['time', 'truck_number', 'seconds'])
+
+# One version of the plan: the package records on each truck and each truck's route (in the find_shortest_path format)
+# after the event applied at `seconds` after midnight, and the packages still held back. The initial plan has no event.
+# Versions are never modified; applying an event builds the next one and copies only the trucks and records it changes.
+PlanVersion = namedtuple('PlanVersion', ['version', 'seconds', 'event', 'trucks', 'trucks_with_paths',
+                                         'held_packages'])
+
+# Routing times are datetimes on the strptime base date, like the routers' times.
+BASE_DATE = datetime.datetime(1900, 1, 1)
+
+
+# Returns the IDs of the packages that wait for an address correction in events.
+# Time complexity: O(E) where E is the number of events
+# Space complexity: O(E)
+def get_held_packages(events):
+    return frozenset(event.package_id for event in events if isinstance(event, AddressCorrection))
+
+
+# Returns the record of a package as it stood at the given time in seconds, given the records it had before each of its
+# corrections (see Replanner.package_history). Packages without corrections are returned as they are.
+# Time complexity: O(C) where C is the number of corrections of the package
+# Space complexity: O(1)
+def package_at_time(package_history, package, seconds):
+    for superseded_at, previous_package in package_history.get(package[0], ()):
+        if seconds < superseded_at:
+            return previous_package
+    return package
+
+
+# Returns how many path entries of a route are fixed at the given time in seconds, and the clock in seconds at the last
+# of them. A truck that has not left yet keeps only the hub departure. A truck on the road keeps every stop it reached,
+# and with keep_next also the stop it is driving to, since it finishes the leg it is on. A truck that made all its
+# deliveries keeps its whole route.
+# Time complexity: O(N) where N is the number of packages on the route
+# Space complexity: O(N)
+def get_fixed_prefix(route, seconds, keep_next=True):
+    times = [datetime_to_seconds(time) for time in route['times']]
+    if times[0] >= seconds:
+        return 1, times[0]
+    fixed = 1
+    while fixed < len(times) and times[fixed] <= seconds:
+        fixed += 1
+    if keep_next and fixed < len(times):
+        next_stop, next_arrival = route['path'][fixed], times[fixed]
+        while fixed < len(times) and route['path'][fixed] == next_stop and times[fixed] == next_arrival:
+            fixed += 1
+    return fixed, times[fixed - 1]
+
+
+# Event-driven re-planner. It keeps every plan version and, for each event, re-routes only the trucks the event
+# touches: the truck carrying a corrected package, the truck a late package is loaded on, or the delayed truck, plus
+# any later truck whose departure moves because a first-wave truck now finishes at a different time
+# (Distance.get_departure_time, or departure_rule, such as FleetSimulator.DriverDepartures). A truck on the road
+# keeps the part of its route it has already driven and is re-routed from its next stop and arrival time with
+# truck_router, the router the plan was made with (find_truck_path by default); a truck still at the hub is routed again
+# from its departure. Every other truck's route is
+# reused as it is. A Replanner rebuilt from a cached plan starts at that plan's version number and time (version,
+# seconds), so it accepts the same events as the Replanner that computed it.
+# Space complexity: O(K * T * P) for K versions, T trucks and P packages per truck, less the shared unchanged trucks
+class Replanner:
+    def __init__(self, allocated_trucks, trucks_with_paths, addresses_dict, distances_dict,
+                 truck_capacity=TRUCK_CAPACITY, held_packages=frozenset(), package_history=None,
+                 departure_rule=get_departure_time, version=1, seconds=None, truck_router=find_truck_path):
+        self.distances_dict = distances_dict
+        self.truck_router = truck_router
+        self.departure_rule = departure_rule
+        self.address_index = build_address_index(addresses_dict)
+        self.hub_index = find_location_index_by_address(HUB_ADDRESS, addresses_dict)
+        self.truck_capacity = truck_capacity
+        # {package ID: [(seconds, record before the correction at that time), ...]} in time order.
+        self.package_history = {package_id: list(history) for package_id, history in (package_history or {}).items()}
+        self.versions = [PlanVersion(version, seconds, None, [list(truck) for truck in allocated_trucks],
+                                     list(trucks_with_paths), frozenset(held_packages))]
+
+    @property
+    def current(self):
+        return self.versions[-1]
+
+    # Applies one event and returns the new plan version. Events must come in time order. Raises ValueError for an
+    # event that cannot be applied (unknown package or address, a package already delivered, no truck with room).
+    # Time complexity: O(A * (V^2 + P + S^2)) where A is the number of re-routed trucks (see find_truck_path)
+    # Space complexity: O(T + A * P)
+    def apply(self, event):
+        current = self.current
+        seconds = to_seconds(event.time)
+        if current.seconds is not None and seconds < current.seconds:
+            raise ValueError(f"Event at {event.time} is earlier than the current plan version")
+
+        trucks = list(current.trucks)
+        routes = list(current.trucks_with_paths)
+        held_packages = current.held_packages
+        if isinstance(event, AddressCorrection):
+            rerouted, held_packages = self._correct_address(event, seconds, trucks, routes, held_packages)
+        elif isinstance(event, LatePackage):
+            rerouted = self._add_late_package(event, seconds, trucks, routes, held_packages)
+        elif isinstance(event, TruckDelay):
+            rerouted = self._delay_truck(event, seconds, trucks, routes, held_packages)
+        else:
+            raise ValueError(f"Unknown event {event!r}")
+        rerouted |= self._update_departures(seconds, trucks, routes, held_packages)
+
+        version = PlanVersion(current.version + 1, seconds, event, trucks, routes, held_packages)
+        self.versions.append(version)
+        logger.info("Plan version %d: %s re-routed trucks %s", version.version, type(event).__name__,
+                    sorted(truck_index + 1 for truck_index in rerouted))
+        return version
+
+    def _correct_address(self, event, seconds, trucks, routes, held_packages):
+        truck_index, package = self._find_package(trucks, event.package_id)
+        location_index = self.address_index.get(event.address)
+        if location_index is None:
+            raise ValueError(f"Unknown address {event.address!r} for package {event.package_id}")
+
+        route = routes[truck_index]
+        fixed, clock_seconds = get_fixed_prefix(route, seconds)
+        if event.package_id in route['packages'][:fixed - 1]:
+            # The package is on the stop the truck is driving to, so the truck is re-routed from its last stop.
+            fixed, clock_seconds = get_fixed_prefix(route, seconds, keep_next=False)
+            if event.package_id in route['packages'][:fixed - 1]:
+                raise ValueError(f"Package {event.package_id} was delivered before {event.time}")
+
+        corrected_package = list(package)
+        corrected_package[1:6] = [location_index, event.address, event.city, event.state, event.zip]
+        self.package_history.setdefault(event.package_id, []).append((seconds, package))
+        trucks[truck_index] = [corrected_package if truck_package is package else truck_package
+                               for truck_package in trucks[truck_index]]
+        held_packages = held_packages - {event.package_id}
+        # The truck cannot turn towards the new address before the correction arrives.
+        departed = datetime_to_seconds(route['times'][0]) < seconds
+        routes[truck_index] = self._reroute(route, fixed, max(clock_seconds, seconds), trucks[truck_index],
+                                            held_packages, deliver_late=departed)
+        return {truck_index}, held_packages
+
+    def _add_late_package(self, event, seconds, trucks, routes, held_packages):
+        package = list(event.package_info)
+        if package[6] == "EOD":
+            package[6] = "17:00:00"
+        if package[1] is None:
+            raise ValueError(f"Unknown address {package[2]!r} for package {package[0]}")
+        if any(truck_package[0] == package[0] for truck in trucks for truck_package in truck):
+            raise ValueError(f"Package {package[0]} is already on a truck")
+
+        required_truck = get_required_truck(package, len(trucks))
+        late_truck_index = min(LATE_TRUCK_INDEX, len(trucks) - 1)
+
+        # Trucks still at the hub with room that the package's note allows (-1 stands for the late trucks).
+        def can_load(truck_index):
+            if departures[truck_index] < seconds or len(trucks[truck_index]) >= self.truck_capacity:
+                return False
+            if required_truck == -1:
+                return truck_index >= late_truck_index
+            return required_truck is None or required_truck == truck_index
+
+        departures = [datetime_to_seconds(route['times'][0]) for route in routes]
+        candidates = [truck_index for truck_index in range(len(trucks)) if can_load(truck_index)]
+        if not candidates:
+            raise ValueError(f"No truck at the hub has room for package {package[0]} at {event.time}")
+
+        truck_index = min(candidates, key=departures.__getitem__)
+        trucks[truck_index] = trucks[truck_index] + [package]
+        routes[truck_index] = self._reroute(routes[truck_index], 1, departures[truck_index], trucks[truck_index],
+                                            held_packages)
+        return {truck_index}
+
+    def _delay_truck(self, event, seconds, trucks, routes, held_packages):
+        truck_index = event.truck_number - 1
+        if not 0 <= truck_index < len(trucks):
+            raise ValueError(f"Unknown truck {event.truck_number}")
+
+        route = routes[truck_index]
+        # A truck still at the hub leaves later; a truck on the road reaches every stop after `seconds` later.
+        delay = datetime.timedelta(seconds=event.seconds)
+        if datetime_to_seconds(route['times'][0]) >= seconds:
+            times = [time + delay for time in route['times']]
+        else:
+            times = [time + delay if datetime_to_seconds(time) > seconds else time for time in route['times']]
+        route = dict(route, times=times)
+        fixed, clock_seconds = get_fixed_prefix(route, seconds)
+        if fixed == len(times):
+            # Every delivery is made; the delay only holds up the return to the hub.
+            return set()
+        departed = datetime_to_seconds(route['times'][0]) < seconds
+        routes[truck_index] = self._reroute(route, fixed, max(clock_seconds, seconds), trucks[truck_index],
+                                            held_packages, deliver_late=departed)
+        return {truck_index}
+
+    # Moves the departure of every later truck still at the hub to when the first-wave trucks now finish, but not
+    # before the event. Returns the indexes of the trucks re-routed.
+    def _update_departures(self, seconds, trucks, routes, held_packages):
+        rerouted = set()
+        for truck_index in range(LATE_TRUCK_INDEX, len(routes)):
+            departure_seconds = datetime_to_seconds(routes[truck_index]['times'][0])
+            if departure_seconds < seconds:
+                continue
+            new_departure_seconds = max(datetime_to_seconds(self.departure_rule(truck_index, routes)), seconds)
+            if new_departure_seconds != departure_seconds:
+                routes[truck_index] = self._reroute(routes[truck_index], 1, new_departure_seconds, trucks[truck_index],
+                                                    held_packages)
+                rerouted.add(truck_index)
+        return rerouted
+
+    @staticmethod
+    def _find_package(trucks, package_id):
+        for truck_index, truck in enumerate(trucks):
+            for package in truck:
+                if package[0] == package_id:
+                    return truck_index, package
+        raise ValueError(f"Package {package_id} is not on any truck")
+
+    # Keeps the first `fixed` path entries of a route and routes the truck's other packages, except held ones, from
+    # the last kept stop at clock_seconds. With fixed == 1 the whole route is rebuilt from the hub. A truck that has
+    # made every delivery of its route first finishes its drive back to the hub and leaves it again, not before it
+    # gets there; that return leg is added to the miles of the first new leg, since the path has one entry per package.
+    # A truck already on the road is re-routed with deliver_late, so packages it can no longer deliver in time stay on
+    # its route, delivered late, instead of going back to 'At the hub' on a truck that has left.
+    # Time complexity: that of truck_router, O(V^2 + P + S^2) for find_truck_path
+    def _reroute(self, route, fixed, clock_seconds, truck, held_packages, deliver_late=False):
+        kept_packages = set(route['packages'][:fixed - 1])
+        packages = [package for package in truck if package[0] not in kept_packages and package[0] not in held_packages]
+        deadlines_dict = {package[0]: datetime.datetime.strptime(package[6], "%H:%M:%S") for package in packages}
+        if fixed == 1:
+            clock = BASE_DATE + datetime.timedelta(seconds=clock_seconds)
+            return self.truck_router(packages, clock, self.hub_index, deadlines_dict, self.distances_dict,
+                                     deliver_late=deliver_late)
+
+        start_index = route['path'][fixed - 1]
+        return_miles = 0
+        if fixed == len(route['times']):
+            travel_seconds = get_travel_seconds_matrix(get_distance_matrix(self.distances_dict))
+            hub_arrival = datetime_to_seconds(route['times'][-1]) + travel_seconds[start_index][self.hub_index]
+            clock_seconds = max(clock_seconds, hub_arrival)
+            return_miles = route['distances'][-1]
+            start_index = None
+        clock = BASE_DATE + datetime.timedelta(seconds=clock_seconds)
+        suffix = self.truck_router(packages, clock, self.hub_index, deadlines_dict, self.distances_dict,
+                                   start_index=start_index, deliver_late=deliver_late)
+        suffix_distances = list(suffix['distances'])
+        suffix_distances[0] += return_miles
+        return {"path": route['path'][:fixed] + suffix['path'][1:],
+                "distances": route['distances'][:fixed - 1] + suffix_distances,
+                "times": route['times'][:fixed] + suffix['times'][1:],
+                "packages": route['packages'][:fixed - 1] + suffix['packages']}
@@ -0,0 +1,172 @@
+import datetime
+import time
+from collections import deque
+
+from Distance import datetime_to_seconds, get_distance, get_distance_matrix, get_travel_seconds_matrix
+
+
+# Returns the deadline of every location on a truck in seconds after midnight. When several packages go to one
+# location, the earliest deadline wins.
+# Time complexity: O(P) where P is the number of packages on the truck.
+# Space complexity: O(P)
+def get_location_deadlines(truck_packages):
+    location_deadlines = {}
+    for package_info in truck_packages:
+        (h, m, s) = package_info[6].split(':')
+        deadline = int(h) * 3600 + int(m) * 60 + int(s)
+        location_index = package_info[1]
+        if deadline < location_deadlines.get(location_index, float("inf")):
+            location_deadlines[location_index] = deadline
+    return location_deadlines
+
+
+# Local search state for one truck route. The route is a list of location IDs that starts and ends at the hub; the hub
+# positions never move. Moves are scored by the change in driven miles (direct distances, as reported by
+# find_shortest_path), while arrival times add up the router's whole-second shortest-path travel times
+# (get_travel_seconds_matrix), so they are the times build_truck_path would publish for the route.
+# arrivals[k] is the arrival time at position k in seconds after midnight, and slack[k] is the smallest
+# deadline - arrival over positions k and later, so a move that delays everything after position k by delta is
+# feasible for that suffix when delta <= slack[k].
+class RouteImprover:
+    def __init__(self, path, departure_seconds, location_deadlines, distances_dict, travel_seconds):
+        self.route = list(path)
+        self.departure_seconds = departure_seconds
+        self.location_deadlines = location_deadlines
+        self.distances_dict = distances_dict
+        self.travel_seconds = travel_seconds
+        self.arrivals = []
+        self.slack = []
+        self._rebuild_prefixes()
+
+    # Direct distance between two locations, used to score moves.
+    def _miles(self, index1, index2):
+        return get_distance(self.distances_dict, index1, index2)
+
+    # Travel time between two locations in whole seconds, used for deadline checks.
+    def _seconds(self, index1, index2):
+        return self.travel_seconds[index1][index2]
+
+    def _deadline(self, position):
+        if position in (0, len(self.route) - 1):
+            return float("inf")
+        return self.location_deadlines.get(self.route[position], float("inf"))
+
+    # Recomputes the arrival-time prefixes and the slack suffixes after a move has been applied.
+    # Time complexity: O(N) where N is the number of stops on the route.
+    def _rebuild_prefixes(self):
+        route = self.route
+        self.arrivals = [self.departure_seconds]
+        for position in range(1, len(route)):
+            self.arrivals.append(self.arrivals[-1] + self._seconds(route[position - 1], route[position]))
+
+        self.slack = [float("inf")] * (len(route) + 1)
+        for position in range(len(route) - 1, -1, -1):
+            self.slack[position] = min(self.slack[position + 1], self._deadline(position) - self.arrivals[position])
+
+    # Checks a candidate route that only differs from the current one between positions lo and hi (inclusive).
+    # Arrivals are recomputed for that window and for position hi + 1, whose incoming edge the move changes too; every
+    # position after that is shifted by the same delta and checked against the precomputed slack.
+    # Time complexity: O(hi - lo)
+    def _is_feasible(self, candidate, lo, hi):
+        last = len(candidate) - 1
+        end = min(hi + 1, last)
+        arrival = self.arrivals[lo - 1]
+        for position in range(lo, end + 1):
+            arrival += self._seconds(candidate[position - 1], candidate[position])
+            if position < last and arrival > self.location_deadlines.get(candidate[position], float("inf")):
+                return False
+        delta = arrival - self.arrivals[end]
+        return delta <= 0 or delta <= self.slack[end + 1]
+
+    # Tries every 2-opt move (reverse route[i..j]) and applies the first one that saves miles and keeps deadlines.
+    # Time complexity: O(N^3) in the worst case, O(N^2) scoring plus O(N) feasibility per improving candidate.
+    def try_two_opt(self):
+        route = self.route
+        last = len(route) - 1
+        for i in range(1, last - 1):
+            for j in range(i + 1, last):
+                delta = (self._miles(route[i - 1], route[j]) + self._miles(route[i], route[j + 1])
+                         - self._miles(route[i - 1], route[i]) - self._miles(route[j], route[j + 1]))
+                if delta < -1e-9:
+                    candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    if self._is_feasible(candidate, i, j):
+                        self.route = candidate
+                        self._rebuild_prefixes()
+                        return delta
+        return 0
+
+    # Tries every Or-opt move (relocate a segment of 1 to 3 stops, in either orientation) and applies the first one that
+    # saves miles and keeps deadlines.
+    # Time complexity: O(N^3) in the worst case.
+    def try_or_opt(self):
+        route = self.route
+        last = len(route) - 1
+        for length in (1, 2, 3):
+            for i in range(1, last - length + 1):
+                segment = route[i:i + length]
+                before, after = route[i - 1], route[i + length]
+                removal = (self._miles(before, after) - self._miles(before, segment[0])
+                           - self._miles(segment[-1], after))
+                remaining = route[:i] + route[i + length:]
+                for p in range(0, len(remaining) - 1):
+                    if p == i - 1:
+                        continue
+                    c, e = remaining[p], remaining[p + 1]
+                    for moved in (segment, segment[::-1]):
+                        delta = (removal + self._miles(c, moved[0]) + self._miles(moved[-1], e)
+                                 - self._miles(c, e))
+                        if delta < -1e-9:
+                            candidate = remaining[:p + 1] + moved + remaining[p + 1:]
+                            lo = min(i, p + 1)
+                            hi = max(i + length - 1, p + length)
+                            if self._is_feasible(candidate, lo, hi):
+                                self.route = candidate
+                                self._rebuild_prefixes()
+                                return delta
+        return 0
+
+
+# Improves one truck route with 2-opt and Or-opt moves until no improving move is left, the time budget (in seconds)
+# runs out or max_iterations moves have been applied. Returns a result in the same format as find_shortest_path.
+# Time complexity: O(I * N^3) where I is the number of applied moves and N the number of stops.
+# Space complexity: O(N)
+def improve_route(truck_with_path, truck_packages, distances_dict, time_budget=0.5, max_iterations=1000):
+    travel_seconds = get_travel_seconds_matrix(get_distance_matrix(distances_dict))
+    departure_time = truck_with_path['times'][0]
+    departure_seconds = datetime_to_seconds(departure_time)
+    improver = RouteImprover(truck_with_path['path'], departure_seconds, get_location_deadlines(truck_packages),
+                             distances_dict, travel_seconds)
+
+    stop_time = time.perf_counter() + time_budget
+    iterations = 0
+    while iterations < max_iterations and time.perf_counter() < stop_time:
+        if improver.try_two_opt() == 0 and improver.try_or_opt() == 0:
+            break
+        iterations += 1
+
+    if iterations == 0:
+        return truck_with_path
+
+    # The accepted route is timed with the same whole-second legs as build_truck_path, so the published times are the
+    # ones its deadlines were checked against.
+    path = improver.route
+    path_distances = [get_distance(distances_dict, path[k - 1], path[k]) for k in range(1, len(path))]
+    path_times = [departure_time + datetime.timedelta(seconds=arrival - departure_seconds)
+                  for arrival in improver.arrivals[:-1]]
+
+    # Moves only reorder locations, and every visit of a location is checked against its earliest deadline, so the
+    # packages of a location are handed to its visits in their previous order.
+    location_packages = {}
+    for location_index, package_id in zip(truck_with_path['path'][1:], truck_with_path['packages']):
+        location_packages.setdefault(location_index, deque()).append(package_id)
+    path_packages = [location_packages[location_index].popleft() for location_index in path[1:-1]]
+    return {"path": path, "distances": path_distances, "times": path_times, "packages": path_packages}
+
+
+# Runs improve_route on every truck. The time budget is shared evenly between the trucks.
+# Time complexity: O(T * I * N^3) where T is the number of trucks.
+# Space complexity: O(T * N)
+def improve_routes(trucks_with_paths, allocated_trucks, distances_dict, time_budget=0.5, max_iterations=1000):
+    truck_budget = time_budget / max(len(trucks_with_paths), 1)
+    return [improve_route(truck_with_path, truck_packages, distances_dict, truck_budget, max_iterations)
+            for truck_with_path, truck_packages in zip(trucks_with_paths, allocated_trucks)]
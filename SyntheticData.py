@@ -0,0 +1,158 @@
+import csv
+import math
+import os
+import random
+import sys
+
+from Allocation import LATE_TRUCK_INDEX
+
+# The hub, and the corrected address of package 9 in Planner.DAY_EVENTS, are always locations 0 and 1 so that the
+# generated data runs through the same pipeline as the shipped CSV files.
+HUB = ("Western Governors University", "4001 South 700 East")
+PACKAGE9_CORRECTION = ("Third District Juvenile Court", "410 S State St")
+
+STREETS = ("State St", "Main St", "W 2100 S", "E 3300 S", "S 900 E", "W North Temple", "Redwood Rd", "S 700 E",
+           "Highland Dr", "W 4800 S", "S 1300 E", "E South Temple", "W 500 S", "Bangerter Hwy", "S 5600 W")
+ZIP_CODES = ("84101", "84103", "84104", "84105", "84106", "84107", "84111", "84115", "84117", "84118", "84119",
+             "84121", "84123")
+
+# Deadline mix and special notes, in the proportions of the shipped Packages.csv.
+DEADLINES = (("09:00:00", 0.03), ("10:30:00", 0.30), ("EOD", 0.67))
+PINNED_SHARE = 0.025
+DELAYED_SHARE = 0.1
+CO_DELIVERY_SHARE = 0.075
+
+# The shares above apply to every manifest size, so a larger manifest has proportionally more packages with a
+# deadline and more co-delivery groups, and a larger fleet has more trucks to pin packages to. The input is not shaped
+# to fit the fleet: only the first-wave trucks leave at 08:00 (see Distance.get_departure_time), and packages the
+# routers cannot deliver on time are reported by Benchmark as unrouted.
+
+# 10:30 packages go to locations this close to the hub, so a greedy route that starts at the hub reaches them early in
+# the morning. The 09:00 package goes to the location nearest the hub, the first stop of a truck that carries it.
+TIMED_RADIUS_MILES = 2.5
+DELAYED_NOTE = "Delayed on flight---will not arrive to depot until 9:05 am"
+
+# Locations are points in a square area; distances are straight lines stretched by a road factor.
+AREA_MILES = 12
+ROAD_FACTOR = 1.25
+
+
+# Returns location_count (name, address) pairs; the first two are HUB and PACKAGE9_CORRECTION.
+# Time complexity: O(V) where V is the number of locations.
+# Space complexity: O(V)
+def generate_addresses(location_count, rng):
+    addresses = [HUB, PACKAGE9_CORRECTION]
+    used = {HUB[1], PACKAGE9_CORRECTION[1]}
+    while len(addresses) < location_count:
+        address = f"{rng.randint(100, 9999)} {rng.choice(STREETS)}"
+        if address not in used:
+            used.add(address)
+            addresses.append((f"Customer {len(addresses)}", address))
+    return addresses
+
+
+# Returns the lower-triangular distance rows for location_count random points, in tenths of a mile. Distances are
+# rounded up, and rounding up keeps the triangle inequality: ceil(a) <= ceil(b + c) <= ceil(b) + ceil(c) for tenths.
+# Every off-diagonal distance is at least 0.1, since read_csv_files drops zero entries.
+# Time complexity: O(V^2) where V is the number of locations.
+# Space complexity: O(V^2)
+def generate_distances(location_count, rng):
+    points = [(AREA_MILES / 2, AREA_MILES / 2)]
+    points.extend((rng.uniform(0, AREA_MILES), rng.uniform(0, AREA_MILES)) for _ in range(location_count - 1))
+    rows = []
+    for i, (x1, y1) in enumerate(points):
+        row = [max(1, math.ceil(math.hypot(x1 - x2, y1 - y2) * ROAD_FACTOR * 10 - 1e-9)) / 10
+               for x2, y2 in points[:i]]
+        row.append(0.0)
+        rows.append(row)
+    return rows
+
+
+def _pick_deadline(rng):
+    roll = rng.random()
+    for deadline, share in DEADLINES:
+        if roll < share:
+            return deadline
+        roll -= share
+    return DEADLINES[-1][0]
+
+
+# Returns package_count packages.csv rows (ID, address, city, state, zip, deadline, weight, special note) delivered to
+# the given addresses, with the deadline mix of DEADLINES. A share of the packages is pinned to one of truck_count
+# trucks, delayed, or put in a "Must be delivered with" group of 3 or 4 end-of-day packages without other constraints;
+# delayed packages are due at end of day. A package with a deadline goes to one of the locations that
+# deadline_locations gives for its deadline (any location by default) and is pinned, if at all, to a first-wave truck.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(P)
+def generate_packages(package_count, addresses, truck_count, rng, deadline_locations=None):
+    zip_codes = [rng.choice(ZIP_CODES) for _ in addresses]
+    deadline_locations = deadline_locations or {}
+    packages = []
+    for package_id in range(1, package_count + 1):
+        deadline = _pick_deadline(rng)
+        locations = deadline_locations.get(deadline)
+        location_index = rng.choice(locations) if locations else rng.randrange(1, len(addresses))
+        packages.append([str(package_id), addresses[location_index][1], "Salt Lake City", "UT",
+                         zip_codes[location_index], deadline, str(rng.randint(1, 88)), "None"])
+
+    order = list(range(package_count))
+    rng.shuffle(order)
+    position = 0
+    for _ in range(int(package_count * PINNED_SHARE)):
+        package = packages[order[position]]
+        last_truck = truck_count if package[5] == "EOD" else min(LATE_TRUCK_INDEX, truck_count)
+        package[7] = f"Can only be on truck {rng.randint(1, last_truck)}"
+        position += 1
+    for _ in range(int(package_count * DELAYED_SHARE)):
+        packages[order[position]][5] = "EOD"
+        packages[order[position]][7] = DELAYED_NOTE
+        position += 1
+    grouped = 0
+    group_limit = package_count * CO_DELIVERY_SHARE
+    order = [index for index in order[position:] if packages[index][5] == "EOD"]
+    position = 0
+    while grouped < group_limit and position + 4 <= len(order):
+        group = [packages[order[position + offset]] for offset in range(rng.choice((3, 4)))]
+        position += len(group)
+        grouped += len(group)
+        group[0][7] = "Must be delivered with " + " & ".join(member[0] for member in group[1:])
+    return packages
+
+
+# Writes Addresses.csv, Distances.csv and Packages.csv for one synthetic day to directory, in the layout of the shipped
+# files, and returns the three file paths. The same seed always produces the same files.
+# Time complexity: O(V^2 + P) where V is the number of locations and P the number of packages.
+# Space complexity: O(V^2 + P)
+def write_dataset(directory, package_count, location_count, truck_count, seed=0):
+    rng = random.Random(seed)
+    addresses = generate_addresses(location_count, rng)
+    distance_rows = generate_distances(location_count, rng)
+    hub_distances = {index: distance_rows[index][0] for index in range(1, location_count)}
+    deadline_locations = {
+        "09:00:00": [min(hub_distances, key=hub_distances.get)],
+        "10:30:00": [index for index, distance in hub_distances.items() if distance <= TIMED_RADIUS_MILES],
+    }
+    packages = generate_packages(package_count, addresses, truck_count, rng, deadline_locations)
+
+    os.makedirs(directory, exist_ok=True)
+    addresses_file_path = os.path.join(directory, 'Addresses.csv')
+    distances_file_path = os.path.join(directory, 'Distances.csv')
+    packages_file_path = os.path.join(directory, 'Packages.csv')
+    with open(addresses_file_path, 'w', newline='') as address_file:
+        csv.writer(address_file).writerows((index, name, address) for index, (name, address) in enumerate(addresses))
+    with open(distances_file_path, 'w', newline='') as distance_file:
+        writer = csv.writer(distance_file)
+        for row in distance_rows:
+            writer.writerow([f"{distance:g}" for distance in row] + [''] * (location_count - len(row)))
+    with open(packages_file_path, 'w', newline='') as package_file:
+        csv.writer(package_file).writerows(package + [''] for package in packages)
+    return addresses_file_path, distances_file_path, packages_file_path
+
+
+# Usage: python SyntheticData.py <directory> <packages> <locations> <trucks> [seed]
+if __name__ == '__main__':
+    if len(sys.argv) < 5:
+        sys.exit("Usage: python SyntheticData.py <directory> <packages> <locations> <trucks> [seed]")
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    for file_path in write_dataset(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]), seed):
+        print(file_path)
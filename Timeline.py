@@ -0,0 +1,112 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Package statuses, as shown by the tracker.
+AT_HUB = 0
+EN_ROUTE = 1
+DELIVERED = 2
+STATUS_NAMES = ("At Hub", "En Route", "Delivered")
+
+
+# Converts an 'HH:MM:SS' or 'HH:MM' string to seconds after midnight.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def to_seconds(time_string):
+    parts = str(time_string).split(':')
+    hours, minutes = int(parts[0]), int(parts[1])
+    seconds = int(parts[2]) if len(parts) > 2 else 0
+    return hours * 3600 + minutes * 60 + seconds
+
+
+# Converts seconds after midnight back to an 'HH:MM:SS' string.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def to_time_string(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+# Sort key for package IDs: numeric IDs in number order, then any other IDs in string order.
+# Time complexity: O(1) for IDs of bounded length
+def package_id_key(package_id):
+    package_id = str(package_id)
+    return (0, int(package_id), package_id) if package_id.isdecimal() else (1, 0, package_id)
+
+
+# Stands for a departure or delivery time that was never scheduled, so the package stays at the hub.
+NOT_SCHEDULED = 2 ** 31 - 1
+
+
+# Converts a planned time to seconds, or NOT_SCHEDULED when the package was never routed.
+def _planned_seconds(time_string):
+    return to_seconds(time_string) if time_string else NOT_SCHEDULED
+
+
+# Status timeline built once after planning. Departure and delivery times are parsed a single time into integer seconds
+# and kept in typed arrays, both per package and sorted, so that "what was the state at time T" is answered without
+# re-parsing any strings: one package in O(1), counts for any time in O(log n) with bisect.
+# A package is at the hub until its truck leaves (departure >= T), en route until it is delivered and delivered from
+# its delivery time on, matching the tracker's rules.
+# Space complexity: O(n), where n is the number of packages
+class StatusTimeline:
+    def __init__(self, packages):
+        packages = sorted(packages, key=lambda package: package_id_key(package[0]))
+        self.package_ids = [package[0] for package in packages]
+        self.positions = {package_id: position for position, package_id in enumerate(self.package_ids)}
+        self.departures = array('l', (_planned_seconds(package[9]) for package in packages))
+        # An unrouted package keeps 'At the hub' in its delivery field, so its departure decides.
+        self.deliveries = array('l', (_planned_seconds(package[10] if package[9] else '') for package in packages))
+
+        departure_order = sorted(range(len(packages)), key=self.departures.__getitem__)
+        delivery_order = sorted(range(len(packages)), key=self.deliveries.__getitem__)
+        self.sorted_departures = array('l', (self.departures[position] for position in departure_order))
+        self.sorted_deliveries = array('l', (self.deliveries[position] for position in delivery_order))
+        self.delivery_order = array('l', delivery_order)
+
+    # Builds the timeline from the package hash table once departure and delivery times have been written to it.
+    # Time complexity: O(n log n)
+    @classmethod
+    def from_hash_table(cls, hashtable):
+        return cls(hashtable.to_list())
+
+    def __len__(self):
+        return len(self.package_ids)
+
+    def _status(self, position, seconds):
+        if self.departures[position] >= seconds:
+            return AT_HUB
+        if seconds < self.deliveries[position]:
+            return EN_ROUTE
+        return DELIVERED
+
+    # Returns (status, departure seconds, delivery seconds) of one package at the given time in seconds, or None for an
+    # unknown package ID.
+    # Time complexity: O(1)
+    def status_at(self, package_id, seconds):
+        position = self.positions.get(str(package_id))
+        if position is None:
+            return None
+        return self._status(position, seconds), self.departures[position], self.deliveries[position]
+
+    # Returns (package ID, status, departure seconds, delivery seconds) for every package, ordered by package ID.
+    # Time complexity: O(n)
+    def snapshot(self, seconds):
+        return [(package_id, self._status(position, seconds), self.departures[position], self.deliveries[position])
+                for position, package_id in enumerate(self.package_ids)]
+
+    # Returns the number of packages (at hub, en route, delivered) at the given time.
+    # Time complexity: O(log n)
+    def status_counts(self, seconds):
+        at_hub = len(self) - bisect_left(self.sorted_departures, seconds)
+        delivered = bisect_right(self.sorted_deliveries, seconds)
+        return at_hub, len(self) - at_hub - delivered, delivered
+
+    # Batch form of status_counts for many query times.
+    # Time complexity: O(q log n) where q is the number of query times
+    def status_counts_many(self, times):
+        return [self.status_counts(seconds) for seconds in times]
+
+    # Returns the IDs of the packages delivered by the given time, in delivery order.
+    # Time complexity: O(log n + k) where k is the number of packages returned
+    def delivered_by(self, seconds):
+        count = bisect_right(self.sorted_deliveries, seconds)
+        return [self.package_ids[position] for position in self.delivery_order[:count]]
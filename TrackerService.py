@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import re
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+from PackageStore import PackageStore
+from Planner import Planner, PLAN_CACHE_DIRECTORY
+from Replanner import package_at_time
+from Timeline import NOT_SCHEDULED, STATUS_NAMES, to_time_string
+
+logger = logging.getLogger(__name__)
+
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8950
+
+# Largest request head (and request body) accepted, and how many per-time snapshots each plan keeps encoded.
+MAX_REQUEST_BYTES = 8192
+SNAPSHOT_CACHE_SIZE = 1440
+
+# Query times: 'H:MM' or 'HH:MM', optionally with ':SS', in ASCII digits only (no signs or spaces).
+QUERY_TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?", re.ASCII)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           503: 'Service Unavailable'}
+
+
+# Read-only view of one computed plan, as served by TrackerService. The package records are copied into a columnar
+# PackageStore, with planned times in integer seconds and the address fields interned, and the truck mileage is summed
+# once, so requests never touch the Planner and each answer is read from the columns through a Package view. Nothing
+# in here changes after construction apart from the cache of encoded snapshots, which only ever gains entries.
+# Space complexity: O(P + T) where P is the number of packages and T the number of trucks
+class PlanSnapshot:
+    def __init__(self, planner, version=1):
+        self.version = version
+        self.packages = PackageStore.from_packages(planner.published_packages.to_list())
+        self.status_timeline = planner.status_timeline
+        self.package_history = {package_id: tuple(history) for package_id, history in planner.package_history.items()}
+        truck_distances, total_distance = planner.truck_distances
+        self.truck_distances = tuple(truck_distances)
+        self.total_distance = total_distance
+        self._snapshots = {}
+
+    # Returns the tracker view of one package at the given time in seconds, or None for an unknown package ID.
+    # Time complexity: O(1)
+    def package_status(self, package_id, seconds):
+        package = self.packages.get(package_id)
+        if package is None:
+            return None
+        return self._describe(package, package.status_at(seconds), seconds)
+
+    def _describe(self, package, status, seconds):
+        # A corrected package shows the address it had at that time, as in the tracker.
+        record = package
+        if package.id in self.package_history:
+            record = package_at_time(self.package_history, package, seconds)
+        return {"id": package.id, "address": record[2], "city": record[3], "state": record[4], "zip": record[5],
+                "deadline": to_time_string(package.deadline_seconds), "weight": package.weight, "note": package.note,
+                "departure": _time_or_none(package.departure_seconds),
+                "delivery": _time_or_none(package.delivery_seconds), "status": STATUS_NAMES[status]}
+
+    # Returns the tracker view of every package at the given time in seconds, ordered by package ID.
+    # Time complexity: O(P)
+    def snapshot(self, seconds):
+        return [self._describe(self.packages.get(package_id), status, seconds)
+                for package_id, status, _, _ in self.status_timeline.snapshot(seconds)]
+
+    # Returns the encoded JSON list of every package at the given time in seconds, computed once per time.
+    # Time complexity: O(P) the first time for a given time, O(1) afterwards
+    def snapshot_json(self, seconds):
+        encoded = self._snapshots.get(seconds)
+        if encoded is None:
+            encoded = json.dumps({"version": self.version, "time": to_time_string(seconds),
+                                  "packages": self.snapshot(seconds)}).encode()
+            if len(self._snapshots) < SNAPSHOT_CACHE_SIZE:
+                self._snapshots[seconds] = encoded
+        return encoded
+
+    # Time complexity: O(log P)
+    def status_counts(self, seconds):
+        at_hub, en_route, delivered = self.status_timeline.status_counts(seconds)
+        return {"version": self.version, "time": to_time_string(seconds),
+                "counts": dict(zip(STATUS_NAMES, (at_hub, en_route, delivered)))}
+
+    # Time complexity: O(T)
+    def mileage(self):
+        return {"version": self.version, "total": self.total_distance,
+                "trucks": [{"truck": truck_number, "miles": miles}
+                           for truck_number, miles in enumerate(self.truck_distances, start=1)]}
+
+
+# Planned times as 'HH:MM:SS', or None for a package that was never routed.
+def _time_or_none(seconds):
+    return None if seconds == NOT_SCHEDULED else to_time_string(seconds)
+
+
+# Parses a query time ('HH:MM' or 'HH:MM:SS') into seconds after midnight. Raises ValueError when it is malformed or
+# a field is out of range (hours 0-23, minutes and seconds 0-59).
+# Time complexity: O(1)
+def parse_query_time(time_string):
+    match = QUERY_TIME_PATTERN.fullmatch(time_string)
+    if match is None:
+        raise ValueError(f"invalid time {time_string!r}, expected HH:MM")
+    hours, minutes, seconds = (int(field or 0) for field in match.groups())
+    if hours > 23 or minutes > 59 or seconds > 59:
+        raise ValueError(f"time {time_string!r} out of range")
+    return hours * 3600 + minutes * 60 + seconds
+
+
+# Parses the ?time= query parameter. Raises ValueError when it is missing or malformed.
+def _query_seconds(query):
+    values = query.get('time')
+    if not values:
+        raise ValueError("missing time parameter")
+    return parse_query_time(values[0])
+
+
+# Asyncio HTTP/JSON service answering tracker queries from a PlanSnapshot on a loopback socket. The served plan is
+# held in a single attribute: each request reads it once and uses that snapshot throughout, so swap_plan replaces it
+# atomically without any locking and in-flight requests finish on the plan they started with.
+# Endpoints (GET):
+# - /packages/<id>?time=HH:MM    one package, as shown by the tracker
+# - /status?time=HH:MM           number of packages at the hub, en route and delivered
+# - /trucks                      mileage of every truck and the total
+# - /snapshot?time=HH:MM         every package at that time
+# - /health                      the plan version
+# POST /reload recomputes the plan with plan_factory in a worker thread and swaps it in; if plan_factory fails, the
+# current plan keeps being served and the request is answered with 503.
+# Connections are kept alive, so a client can pipeline many requests over one socket.
+class TrackerService:
+    def __init__(self, plan, plan_factory=None):
+        self.plan = plan
+        self.plan_factory = plan_factory
+        self.server = None
+        self._reloading = None
+
+    # Serves new requests from plan. Requests already running keep the plan they started with.
+    # Time complexity: O(1)
+    def swap_plan(self, plan):
+        self.plan = plan
+        logger.info("Serving plan version %d", plan.version)
+
+    # Computes a new plan with plan_factory off the event loop and swaps it in. Concurrent reloads share one run.
+    async def reload(self):
+        if self._reloading is None:
+            loop = asyncio.get_running_loop()
+            version = self.plan.version + 1
+            self._reloading = loop.run_in_executor(None, lambda: PlanSnapshot(self.plan_factory(), version))
+        try:
+            self.swap_plan(await self._reloading)
+        finally:
+            self._reloading = None
+        return self.plan
+
+    async def start(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        self.server = await asyncio.start_server(self._handle_connection, host, port,
+                                                 limit=MAX_REQUEST_BYTES, backlog=4096)
+        return self.server
+
+    # Routes one request to its handler. Returns (status code, JSON body bytes).
+    async def dispatch(self, method, target):
+        plan = self.plan
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+        try:
+            if method == 'POST' and parts == ['reload']:
+                if self.plan_factory is None:
+                    return 503, {"error": "reloading is not configured"}
+                try:
+                    plan = await self.reload()
+                except Exception as error:
+                    # The plan being served stays in place; the client can retry once the inputs are fixed.
+                    logger.exception("Reloading the plan failed")
+                    return 503, {"error": f"reload failed: {error}"}
+                return 200, {"version": plan.version}
+            if method != 'GET':
+                return 405, {"error": f"method {method} not allowed"}
+            if parts == ['health']:
+                return 200, {"version": plan.version, "packages": len(plan.packages)}
+            if parts == ['trucks']:
+                return 200, plan.mileage()
+            if parts == ['status']:
+                return 200, plan.status_counts(_query_seconds(query))
+            if parts == ['snapshot']:
+                return 200, plan.snapshot_json(_query_seconds(query))
+            if len(parts) == 2 and parts[0] == 'packages':
+                package = plan.package_status(parts[1], _query_seconds(query))
+                if package is None:
+                    return 404, {"error": f"unknown package {parts[1]}"}
+                return 200, dict(package, version=plan.version)
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        return 404, {"error": f"unknown path {url.path}"}
+
+    # Reads requests from one connection until the client closes it or asks to.
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "request too large"}, False)
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                request_line = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    body_length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    body_length = -1
+                if body_length < 0:
+                    # Without a valid length the next request on the connection cannot be found, so it is closed.
+                    await self._respond(writer, 400, {"error": "invalid Content-Length"}, False)
+                    break
+                if body_length > MAX_REQUEST_BYTES:
+                    await self._respond(writer, 413, {"error": "request too large"}, False)
+                    break
+                if body_length:
+                    await reader.readexactly(body_length)
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if len(request_line) != 3:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, False)
+                    break
+                status, body = await self.dispatch(request_line[0], request_line[1])
+                await self._respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, body, keep_alive):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                     f"\r\n".encode() + payload)
+        await writer.drain()
+
+
+# Usage: python TrackerService.py [port]
+# Serves the day's plan (from the plan cache when the inputs are unchanged) on 127.0.0.1.
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else SERVICE_PORT
+
+    def plan_factory():
+        return Planner(cache_directory=PLAN_CACHE_DIRECTORY)
+
+    async def serve():
+        service = TrackerService(PlanSnapshot(plan_factory()), plan_factory)
+        server = await service.start(SERVICE_HOST, port)
+        logger.info("Tracker service listening on http://%s:%d", SERVICE_HOST, port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
@@ -1,18 +1,15 @@
 import csv
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Iterable, Iterator, List
 
 from Hashtable import HashTable
+from Profiler import profiler
 
 
 # Function to return address and distance dictionaries.
 # Time complexity: O(V^2) where V is the number of vertices.
 # Space complexity: O(V^2) where V is the number of vertices.
 def read_csv_files(addresses_file_path: str, distances_file_path: str) -> Tuple[Dict[int, Tuple[str, str]], Dict[Tuple[int, int], float]]:
-    addresses_dict = {}
-    with open(addresses_file_path, newline='') as address_file:
-        reader = csv.reader(address_file)
-        for row in reader:
-            addresses_dict[int(row[0])] = (row[1], row[2])
+    addresses_dict = read_addresses(addresses_file_path)
 
     distances_dict = {}
     with open(distances_file_path, newline='') as distance_file:
@@ -25,44 +22,148 @@ def read_csv_files(addresses_file_path: str, distances_file_path: str) -> Tuple[
     return addresses_dict, distances_dict
 
 
-# Reads the packages.csv file and returns a hash table of packages with the package ID as the key and the package info
-# as the value.
-with open('csv\Packages.csv') as csvfile:
-    csv_reader = csv.reader(csvfile, delimiter=',')
+# Function to return the address dictionary, keyed by location ID with (name, address) values.
+# Time complexity: O(V) where V is the number of vertices.
+# Space complexity: O(V) where V is the number of vertices.
+def read_addresses(addresses_file_path: str) -> Dict[int, Tuple[str, str]]:
+    addresses_dict = {}
+    with open(addresses_file_path, newline='') as address_file:
+        reader = csv.reader(address_file)
+        for row in reader:
+            addresses_dict[int(row[0])] = (row[1], row[2])
+    return addresses_dict
+
+
+# Interns every address into its integer location ID, so later stages resolve an address with one dict lookup and
+# compare location IDs instead of strings.
+# Time complexity: O(V) where V is the number of vertices.
+# Space complexity: O(V) where V is the number of vertices.
+def build_address_index(addresses_dict: Dict[int, Tuple[str, str]]) -> Dict[str, int]:
+    address_index = {}
+    for index, (_, location_address) in addresses_dict.items():
+        address_index.setdefault(location_address, index)
+    return address_index
+
+
+# Packages are streamed in chunks of this many records (see iter_package_chunks).
+PACKAGE_CHUNK_SIZE = 4096
+
+# Columns of a packages.csv row: ID, address, city, state, zip, deadline, weight, special note.
+PACKAGE_COLUMNS = 8
+
+
+# Yields (line number, row) for every non-blank row of the packages.csv file, reading the file lazily.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(1)
+def iter_package_rows(packages_file_path: str) -> Iterator[Tuple[int, List[str]]]:
+    with open(packages_file_path, newline='') as csvfile:
+        csv_reader = csv.reader(csvfile, delimiter=',')
+        for line_number, row in enumerate(csv_reader, start=1):
+            if row:
+                yield line_number, row
+
+
+# Validates one packages.csv row and turns it into a package record, resolving the address to its location ID.
+# Raises ValueError naming the line for a row with missing columns or without a package ID.
+# Time complexity: O(1)
+# Space complexity: O(1)
+def parse_package_row(row: List[str], address_index: Dict[str, int], line_number: int = 0) -> list:
+    if len(row) < PACKAGE_COLUMNS:
+        raise ValueError(f"Packages line {line_number}: expected {PACKAGE_COLUMNS} columns, got {len(row)}")
+    package_ID = row[0].strip()
+    if not package_ID:
+        raise ValueError(f"Packages line {line_number}: missing package ID")
+    address = row[1]
+    city = row[2]
+    state = row[3]
+    zip_code = row[4]
+    delivery_deadline = row[5]
+    size = row[6]
+    special_note = row[7]
+    delivery_start = ''
+    address_location = address_index.get(address)
+    if profiler.enabled:
+        profiler.count('address_lookups')
+    delivery_status = 'At the hub'
+    return [package_ID, address_location, address, city, state,
+            zip_code, delivery_deadline, size, special_note, delivery_start,
+            delivery_status]
+
+
+# Generator pipeline over the packages.csv file: reads, validates and resolves one package record at a time.
+# PackageStore.from_csv consumes it directly, so a large manifest is loaded without holding every record at once.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(1) beyond the records kept by the caller.
+def iter_packages(packages_file_path: str, address_index: Dict[str, int]) -> Iterator[list]:
+    for line_number, row in iter_package_rows(packages_file_path):
+        yield parse_package_row(row, address_index, line_number)
+
+
+# Groups a stream of package records into lists of at most chunk_size records.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(chunk_size)
+def iter_package_chunks(packages: Iterable[list], chunk_size: int = PACKAGE_CHUNK_SIZE) -> Iterator[List[list]]:
+    chunk = []
+    for package_info in packages:
+        chunk.append(package_info)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Streams the packages.csv file into package_hash_table chunk by chunk and yields each chunk once it is inserted, so
+# a consumer (indexing, allocation, writing the records elsewhere) can work on the first packages while the rest of the
+# file is still being read. Only one chunk is held besides what the hash table and the consumer keep.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(chunk_size)
+def stream_packages(packages_file_path: str, address_index: Dict[str, int], package_hash_table: HashTable,
+                    chunk_size: int = PACKAGE_CHUNK_SIZE) -> Iterator[List[list]]:
+    for chunk in iter_package_chunks(iter_packages(packages_file_path, address_index), chunk_size):
+        for package_info in chunk:
+            package_hash_table.insert(package_info[0], package_info)
+        yield chunk
+
+
+# Loads the packages.csv file straight into a hash table without building a package list. With package_indexes (a
+# PackageIndexes), every record is also indexed as it is read, and the sorted indexes are built once at the end.
+# Time complexity: O(P) where P is the number of packages, O(P log P) with package_indexes.
+# Space complexity: O(P) for the hash table and indexes, plus one chunk.
+def load_packages(packages_file_path: str, address_index: Dict[str, int], package_indexes=None,
+                  chunk_size: int = PACKAGE_CHUNK_SIZE) -> HashTable:
+    package_hash_table = HashTable()
+    chunks = stream_packages(packages_file_path, address_index, package_hash_table, chunk_size)
+    if package_indexes is None:
+        for _ in chunks:
+            pass
+    else:
+        package_indexes.add_many((package_info, None) for chunk in chunks for package_info in chunk)
+    return package_hash_table
+
 
+# Reads the packages.csv file and returns a hash table of packages with the package ID as the key and the package info
+# as the value, together with the list of packages in file order. Each package address is resolved to its location ID
+# here, once, and stored in the package record. The hash table is filled from the same stream as the list, so the file
+# is parsed and inserted in one pass.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(P) where P is the number of packages.
+def read_packages(packages_file_path: str, address_index: Dict[str, int]) -> Tuple[HashTable, List[list]]:
     package_hash_table = HashTable()
     package_list = []
+    for chunk in stream_packages(packages_file_path, address_index, package_hash_table):
+        package_list.extend(chunk)
+    return package_hash_table, package_list
 
-    for row in csv_reader:
-        package_ID = row[0]
-        address = row[1]
-        city = row[2]
-        state = row[3]
-        zip_code = row[4]
-        delivery_deadline = row[5]
-        size = row[6]
-        special_note = row[7]
-        delivery_start = ''
-        address_location = ''
-        delivery_status = 'At the hub'
-        package_info = [package_ID, address_location, address, city, state,
-                        zip_code, delivery_deadline, size, special_note, delivery_start,
-                        delivery_status]
-
-        package_list.append(package_info)
 
+# Returns a hash table of the given package records keyed by package ID.
+# Time complexity: O(P) where P is the number of packages.
+# Space complexity: O(P) where P is the number of packages.
+def build_package_hash_table(package_list: List[list]) -> HashTable:
+    package_hash_table = HashTable()
+    package_hash_table.reserve(len(package_list))
     for package_info in package_list:
         key = package_info[0]
         value = package_info
         package_hash_table.insert(key, value)
-
-
-# returns the package hash table
-# Time Complexity: O(1)
-# Space Complexity: O(1)
-def get_package_hash_table():
     return package_hash_table
-
-
-
-
@@ -2,24 +2,32 @@
 # # # Date: 04//08/2023
 # # # Student ID: 001510177
 # #
-from csvReader import get_package_hash_table as get_hash_table
-from Package import trucks_with_paths
-from Distance import get_distances
+from Planner import Planner, PLAN_CACHE_DIRECTORY
+from Replanner import package_at_time
+from Timeline import AT_HUB, EN_ROUTE, STATUS_NAMES, to_time_string
 import datetime
 
+# The day's delivery plan. Nothing is loaded or routed until the tracker first asks for it, and an unchanged plan is
+# loaded from the plan cache instead of being recomputed.
+planner = Planner(cache_directory=PLAN_CACHE_DIRECTORY)
+
+
+# returns the package hash table with the planned departure and delivery times
+# Time Complexity: O(1) once the plan has been computed
+# Space Complexity: O(1)
+def get_hash_table():
+    return planner.published_packages
+
 
 class PackageTracker:
     @staticmethod
-    # Since the address of Package #9 changes after 10:20 in the hash table, this method
-    # shows the initial wrong address before 10:20, just for display purposes.
-    # Time complexity: O(1) - Mainly limited by the 'get_hash_table' method.
-    # Space complexity: O(1) - Determined by the called methods.
-    def initial_package_9_address(input_time, package):
-        updated_package = package.copy()
-        if package[0] == '9' and input_time < datetime.timedelta(hours=10, minutes=20):
-            updated_package[2] = '300 State St'
-            updated_package[5] = '84103'
-        return updated_package
+    # Returns a package as it stood at input_time: a package whose address was corrected later in the day (package 9
+    # at 10:20) is shown with the address listed before the correction.
+    # Other packages are returned as they are, without a copy.
+    # Time complexity: O(1) - At most a few corrections per package.
+    # Space complexity: O(1)
+    def package_at_time(input_time, package):
+        return package_at_time(planner.package_history, package, int(input_time.total_seconds()))
 
     @staticmethod
     # Function to display mileage for each truck
@@ -30,7 +38,7 @@ class PackageTracker:
         if truck_number not in [1, 2, 3]:
             print("Invalid truck number. Please enter 1, 2, or 3.")
             return
-        truck_total_distances, _ = get_distances(trucks_with_paths) # Replace the existing function call
+        truck_total_distances, _ = planner.truck_distances
         print(f"Total mileage for Truck {truck_number}: {truck_total_distances[truck_number - 1]} miles")
 
     @staticmethod
@@ -38,7 +46,7 @@ class PackageTracker:
     def main_menu():
         # Welcome message and display total route distance
         print('<<<*** Welcome to the WGUPS Delivery Service ***>>>')
-        _, total_distance = get_distances(trucks_with_paths) # Replace the existing function call
+        _, total_distance = planner.truck_distances
         print('Total distance of all routes is: ', "{0:.2f}".format(total_distance, 2), 'miles.')
 
         while True:
@@ -65,62 +73,54 @@ class PackageTracker:
 
     # static method for the main menu to track a single package
     @staticmethod
-    # Time complexity: O(N) - Where N is the number of packages
+    # Time complexity: O(1) - The status comes from the precomputed status timeline
     # Space complexity: O(1) - Uses a few variables to store intermediate results
     def track_package():
         try:
             pkg_id = input('Please enter a package ID to lookup: ')
             pkg_status_time = input('Please enter a time in the HH:MM format: ')
 
-            if get_hash_table().lookup(str(pkg_id)) is None:
-                raise ValueError("Invalid Package ID")
-
             original_pkg = get_hash_table().lookup(str(pkg_id))
-            pkg = original_pkg.copy()
-            first_time = pkg[9]
-            print("first time: ", first_time)
-            second_time = pkg[10]
+            if original_pkg is None:
+                raise ValueError("Invalid Package ID")
 
             try:
                 (h, m) = pkg_status_time.split(':')
                 user_time = datetime.timedelta(hours=int(h), minutes=int(m))
-                # Update the address for package 9 if the time is after 10:20
-                pkg = PackageTracker.initial_package_9_address(user_time, original_pkg)
+                # Show the address the package had at that time
+                pkg = PackageTracker.package_at_time(user_time, original_pkg)
 
             except ValueError:
                 raise ValueError("Invalid Time Format")
 
-            (h, m, s) = str(first_time).split(':')
-            first_time_converted = datetime.timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-            (h, m, s) = str(second_time).split(':')
-            second_time_converted = datetime.timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-
-            # Update package status based on user-provided time
-            if first_time_converted >= user_time:
-                pkg[10] = 'At Hub'
-                pkg[9] = '\nLeaves at ' + first_time
-            elif first_time_converted <= user_time:
-                if user_time < second_time_converted:
-                    pkg[10] = 'En Route'
-                    pkg[9] = 'Left at ' + str(first_time)
-                else:
-                    pkg[10] = 'Delivered at ' + second_time
-                    pkg[9] = '\nLeft at ' + str(first_time)
+            status, departure, delivery = planner.status_timeline.status_at(pkg[0], int(user_time.total_seconds()))
+            first_time = to_time_string(departure)
+
+            # Package status based on user-provided time
+            if status == AT_HUB:
+                delivery_status = 'At Hub'
+                truck_status = '\nLeaves at ' + first_time
+            elif status == EN_ROUTE:
+                delivery_status = 'En Route'
+                truck_status = 'Left at ' + first_time
+            else:
+                delivery_status = 'Delivered at ' + to_time_string(delivery)
+                truck_status = '\nLeft at ' + first_time
 
             # Display package information
             print('Package ID:', pkg[0], '\nStreet address:',
                   pkg[2], pkg[3], pkg[4], pkg[5],
                   '  Delivery deadline:', pkg[6],
                   '\nPackage weight:', pkg[7], '\nTruck status:',
-                  pkg[9], '\nDelivery status:',
-                  pkg[10])
+                  truck_status, '\nDelivery status:',
+                  delivery_status)
 
         except ValueError as e:
             print(str(e))
 
     # static method for the main menu to view delivery status for all packages
     @staticmethod
-    # Time complexity: O(N) - Where N is the number of packages
+    # Time complexity: O(N) - Where N is the number of packages, with no time parsing per package
     # Space complexity: O(N) - Creates a table to store package information
     def view_delivery_status():
         try:
@@ -130,41 +130,22 @@ class PackageTracker:
 
             table_data = []
 
-            for count in range(1, 41):
-                original_pkg = get_hash_table().lookup(str(count))
-                pkg = original_pkg.copy()
+            for package_id, status, departure, delivery in planner.status_timeline.snapshot(
+                    int(input_time.total_seconds())):
+                pkg = get_hash_table().lookup(package_id)
 
-                # Check if the package ID is 9 and the input time is 10:20 or later
-                pkg = PackageTracker.initial_package_9_address(input_time, pkg)
+                # Show the address the package had at that time
+                pkg = PackageTracker.package_at_time(input_time, pkg)
                 package_info = [pkg[0], f"{pkg[2]}, {pkg[3]}, {pkg[4]}, {pkg[5]}", pkg[6], pkg[7]]
 
-                try:
-                    time_one = pkg[9]
-                    time_two = pkg[10]
-                    time_one_str = str(time_one)
-                    (h, m, s) = time_one_str.split(':')
-                    convert_time_one = datetime.timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-                    time_two_str = str(time_two)
-                    (h, m, s) = time_two_str.split(':')
-                    convert_time_two = datetime.timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-
-                except ValueError:
-                    pass
-
-                # Update package status based on input time
-                if convert_time_one >= input_time:
-                    package_info.append("At Hub")
+                # Package status based on input time
+                package_info.append(STATUS_NAMES[status])
+                if status == AT_HUB:
                     package_info.append("At Hub")
-                elif convert_time_one <= input_time:
-                    if input_time < convert_time_two:
-                        package_info.append("En Route")
-                        package_info.append("Left at " + str(time_one))
-                    else:
-                        package_info.append("Delivered")
-                        package_info.append("Delivered at " + str(time_two))
+                elif status == EN_ROUTE:
+                    package_info.append("Left at " + to_time_string(departure))
                 else:
-                    package_info.append("Unknown")
-                    package_info.append("Unknown")
+                    package_info.append("Delivered at " + to_time_string(delivery))
                 table_data.append(package_info)
 
             # Set column widths for table display
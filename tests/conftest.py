@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIRECTORY)
+
+
+# The modules open the shipped CSV files by paths relative to the repository, as main.py does.
+@pytest.fixture(autouse=True)
+def repo_directory(monkeypatch):
+    monkeypatch.chdir(REPO_DIRECTORY)
@@ -0,0 +1,34 @@
+from Hashtable import HashTable
+from PackageIndex import PackageIndexes
+from csvReader import (build_address_index, iter_package_chunks, load_packages, read_addresses, read_packages,
+                       stream_packages)
+
+PACKAGES_FILE_PATH = 'CSV/Packages.csv'
+
+
+def address_index():
+    return build_address_index(read_addresses('CSV/Addresses.csv'))
+
+
+def test_chunks_keep_every_record_in_order():
+    chunks = list(iter_package_chunks(range(10), 4))
+    assert chunks == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_each_chunk_is_in_the_hash_table_when_it_is_yielded():
+    package_hash_table = HashTable()
+    seen = 0
+    for chunk in stream_packages(PACKAGES_FILE_PATH, address_index(), package_hash_table, chunk_size=7):
+        assert len(chunk) <= 7
+        seen += len(chunk)
+        assert len(package_hash_table) == seen
+        assert all(package_hash_table.lookup(package_info[0]) is package_info for package_info in chunk)
+    assert seen == 40
+
+
+def test_streaming_load_matches_read_packages():
+    package_hash_table, package_list = read_packages(PACKAGES_FILE_PATH, address_index())
+    package_indexes = PackageIndexes()
+    loaded = load_packages(PACKAGES_FILE_PATH, address_index(), package_indexes, chunk_size=3)
+    assert sorted(loaded.to_list()) == sorted(package_hash_table.to_list()) == sorted(package_list)
+    assert package_indexes.deadlines == PackageIndexes.from_packages(package_list).deadlines
@@ -0,0 +1,33 @@
+from Distance import clear_distance_matrix, get_distance_matrix, set_distance_matrix
+from Profiler import profiler
+
+
+def test_clear_picks_up_an_in_place_change():
+    distances_dict = {(1, 0): 4.0, (2, 0): 1.0, (2, 1): 1.0}
+    assert get_distance_matrix(distances_dict)[0][1] == 2.0
+    # Same size, new value: the entries are not looked at again until the dictionary is cleared.
+    distances_dict[(2, 1)] = 5.0
+    clear_distance_matrix()
+    assert get_distance_matrix(distances_dict)[0][1] == 4.0
+
+
+def test_set_distance_matrix_replaces_the_last_matrix():
+    distances_dict = {(1, 0): 3.0}
+    matrix = [[0, 3.0], [3.0, 0]]
+    set_distance_matrix(distances_dict, matrix)
+    assert get_distance_matrix(distances_dict) is matrix
+
+
+def test_requests_are_counted_only_while_profiling():
+    distances_dict = {(1, 0): 2.5}
+    profiler.reset()
+    get_distance_matrix(distances_dict)
+    assert profiler.snapshot()["counters"].get('distance_matrix_requests') is None
+    profiler.enable()
+    try:
+        get_distance_matrix(distances_dict)
+        get_distance_matrix(distances_dict)
+    finally:
+        profiler.disable()
+    assert profiler.snapshot()["counters"]['distance_matrix_requests'] == 2
+    profiler.reset()
@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+import FleetSimulator
+from Distance import datetime_to_seconds
+from FleetSimulator import simulate_fleet
+from Planner import get_held_packages, Planner
+from Timeline import AT_HUB, DELIVERED, EN_ROUTE
+
+
+def routed_trucks(planner):
+    held_packages = get_held_packages(planner.events)
+    return [[package for package in truck if package[0] not in held_packages] for truck in planner.allocated_trucks]
+
+
+# With two drivers the third truck waits for a driver. Handing over at the hub makes package 6 (delayed until 09:05,
+# due 10:30) late, so the day is run with handoffs at the last delivery instead.
+def test_two_driver_day_is_on_time():
+    planner = Planner(driver_count=2)
+    versions = planner.replanner.versions
+    assert planner.fleet_simulation.handoff_at_last_delivery
+    assert planner.fleet_simulation.late_packages() == []
+    for version in versions:
+        deadlines = {package[0]: datetime.datetime.strptime(package[6], "%H:%M:%S")
+                     for truck in version.trucks for package in truck}
+        for route in version.trucks_with_paths:
+            for package_id, time in zip(route['packages'], route['times'][1:]):
+                assert time <= deadlines[package_id], package_id
+
+
+def test_a_day_that_is_late_either_way_is_rejected():
+    planner = Planner(driver_count=2)
+    with pytest.raises(ValueError, match="1-driver day"):
+        simulate_fleet(routed_trucks(planner), planner.addresses_dict, planner.distances_dict, driver_count=1)
+
+
+def simulated_day(driver_count=2):
+    planner = Planner(driver_count=driver_count, events=())
+    planner.replanner
+    return planner.fleet_simulation
+
+
+# Every replayed state agrees with the routes: a package is at the hub until its truck leaves (and at its departure
+# time), en route until its delivery time and delivered from then on.
+def test_replayed_states_match_the_routes():
+    simulation = simulated_day()
+    log = simulation.log
+    statuses = {}
+    for route in simulation.trucks_with_paths:
+        for package_id, time in zip(route['packages'], route['times'][1:]):
+            statuses[package_id] = (datetime_to_seconds(route['times'][0]), datetime_to_seconds(time))
+    for seconds in sorted(set(log.times)) + [8 * 3600 - 1, 18 * 3600]:
+        state = log.state_at(seconds)
+        for package_id, (departure, delivery) in statuses.items():
+            expected = AT_HUB if seconds <= departure else EN_ROUTE if seconds < delivery else DELIVERED
+            assert state.package_status(package_id) == expected, (package_id, seconds)
+    assert log.state_at(18 * 3600).status_counts() == (0, 0, len(statuses))
+
+
+# Replaying from a checkpoint gives the same state as replaying the whole log.
+def test_checkpoints_do_not_change_replay(monkeypatch):
+    without_checkpoints = simulated_day().log
+    monkeypatch.setattr(FleetSimulator, 'CHECKPOINT_INTERVAL', 1)
+    with_checkpoints = simulated_day().log
+    assert len(with_checkpoints._checkpoints) > 1
+    for seconds in sorted(set(with_checkpoints.times)):
+        expected = without_checkpoints.state_at(seconds)
+        state = with_checkpoints.state_at(seconds)
+        assert list(state.package_statuses) == list(expected.package_statuses)
+        assert list(state.truck_locations) == list(expected.truck_locations)
+        assert list(state.driver_trucks) == list(expected.driver_trucks)
+
+
+def test_event_log_lists_every_delivery_once():
+    simulation = simulated_day()
+    delivered = [event[5] for event in simulation.log.iter_events() if event[1] == 'delivery']
+    assert sorted(delivered) == sorted(package_id for route in simulation.trucks_with_paths
+                                       for package_id in route['packages'])
@@ -0,0 +1,57 @@
+import random
+
+from Hashtable import _EMPTY, HashTable
+
+
+class Key:
+    # A key with a chosen hash, so tests can build probe runs that wrap around the table.
+    def __init__(self, name, key_hash):
+        self.name = name
+        self.key_hash = key_hash
+
+    def __hash__(self):
+        return self.key_hash
+
+    def __eq__(self, other):
+        return isinstance(other, Key) and self.name == other.name
+
+
+def test_remove_shifts_the_probe_run_back():
+    table = HashTable(initial_capacity=4)
+    capacity = len(table._keys)
+    # Four keys with the same home slot near the end of the table, so the run wraps, and one key homed in the run.
+    keys = [Key(f"k{n}", capacity - 2) for n in range(4)] + [Key("other", 0)]
+    for value, key in enumerate(keys):
+        table.insert(key, value)
+    assert len(table._keys) == capacity
+
+    assert table.remove(keys[1])
+    assert table.lookup(keys[1]) is None
+    for value, key in enumerate(keys):
+        if key is not keys[1]:
+            assert table.lookup(key) == value
+    # No tombstones: every later entry of the run moved back one slot, including the key homed inside the run.
+    assert table._keys[capacity - 2:] == [keys[0], keys[2]]
+    assert table._keys[:3] == [keys[3], keys[4], _EMPTY]
+    assert len(list(table)) == len(table) == 4
+
+
+def test_random_operations_match_a_dict():
+    rng = random.Random(7)
+    table = HashTable()
+    expected = {}
+    for _ in range(20000):
+        key = rng.randrange(300)
+        operation = rng.random()
+        if operation < 0.45:
+            table.insert(key, key * 2)
+            expected[key] = key * 2
+        elif operation < 0.8:
+            assert table.remove(key) == (key in expected)
+            expected.pop(key, None)
+        else:
+            assert table.lookup(key) == expected.get(key)
+        assert len(table) == len(expected)
+    assert dict(table.items()) == expected
+    assert all(key in table for key in expected)
+    assert not any(key in table for key in range(300) if key not in expected)
@@ -0,0 +1,82 @@
+import datetime
+import itertools
+import random
+
+from Distance import build_truck_path, find_truck_path, get_distance_matrix
+from HeldKarp import held_karp_truck_path
+from csvReader import read_csv_files
+
+DEPARTURE = datetime.datetime(1900, 1, 1, 8, 0)
+
+
+def load_network():
+    return read_csv_files('CSV/Addresses.csv', 'CSV/Distances.csv')
+
+
+def make_truck(locations):
+    return [[str(index), location, '', '', '', '', '', '', '', '', ''] for index, location in enumerate(locations)]
+
+
+def is_on_time(route, deadlines):
+    return all(time <= deadlines[package_id] for package_id, time in zip(route['packages'], route['times'][1:]))
+
+
+# The routers minimize shortest-path miles; the published 'distances' are the direct edges (see build_truck_path).
+def shortest_path_miles(route, distances_dict):
+    distance_matrix = get_distance_matrix(distances_dict)
+    return sum(distance_matrix[a][b] for a, b in zip(route['path'], route['path'][1:]))
+
+
+# Shortest deadline-feasible route over every stop order, timed the way the routers publish it.
+def brute_force_miles(truck, deadlines, distances_dict, start_index=None):
+    stop_packages = {package[1]: [package[0]] for package in truck}
+    best = None
+    for order in itertools.permutations(stop_packages):
+        route = build_truck_path(list(order), stop_packages, DEPARTURE, 0, distances_dict, start_index)
+        if is_on_time(route, deadlines):
+            miles = shortest_path_miles(route, distances_dict)
+            best = miles if best is None else min(best, miles)
+    return best
+
+
+def test_matches_brute_force_with_deadlines():
+    addresses_dict, distances_dict = load_network()
+    rng = random.Random(5)
+    for _ in range(40):
+        truck = make_truck(rng.sample(range(1, len(addresses_dict)), rng.randint(2, 6)))
+        deadlines = {package[0]: DEPARTURE + datetime.timedelta(minutes=rng.randint(20, 150)) for package in truck}
+        route = held_karp_truck_path(truck, DEPARTURE, 0, deadlines, distances_dict)
+        best = brute_force_miles(truck, deadlines, distances_dict)
+        if best is None:
+            continue
+        assert is_on_time(route, deadlines)
+        assert abs(shortest_path_miles(route, distances_dict) - best) < 1e-6
+
+
+def test_never_longer_than_greedy():
+    addresses_dict, distances_dict = load_network()
+    truck = make_truck(range(1, 10))
+    deadlines = {package[0]: DEPARTURE + datetime.timedelta(hours=10) for package in truck}
+    exact = held_karp_truck_path(truck, DEPARTURE, 0, deadlines, distances_dict)
+    greedy = find_truck_path(truck, DEPARTURE, 0, deadlines, distances_dict)
+    assert sorted(exact['packages']) == sorted(greedy['packages'])
+    assert shortest_path_miles(exact, distances_dict) <= shortest_path_miles(greedy, distances_dict) + 1e-9
+
+
+# A truck already on the road (Replanner._reroute) starts at its last stop and still ends at the hub.
+def test_start_index_routes_from_the_current_stop():
+    addresses_dict, distances_dict = load_network()
+    truck = make_truck([3, 7, 12, 18])
+    deadlines = {package[0]: DEPARTURE + datetime.timedelta(hours=10) for package in truck}
+    route = held_karp_truck_path(truck, DEPARTURE, 0, deadlines, distances_dict, start_index=20)
+    assert route['path'][0] == 20 and route['path'][-1] == 0
+    best = brute_force_miles(truck, deadlines, distances_dict, 20)
+    assert abs(shortest_path_miles(route, distances_dict) - best) < 1e-6
+
+
+def test_deliver_late_routes_packages_that_cannot_make_their_deadline():
+    addresses_dict, distances_dict = load_network()
+    truck = make_truck([3, 7, 12])
+    deadlines = {package[0]: DEPARTURE for package in truck}
+    route = held_karp_truck_path(truck, DEPARTURE, 0, deadlines, distances_dict, deliver_late=True)
+    assert sorted(route['packages']) == ['0', '1', '2']
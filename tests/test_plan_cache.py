@@ -0,0 +1,66 @@
+import os
+
+from PlanCache import HEADER, load_plan, save_plan
+from Planner import Planner
+
+
+def cached_planner(cache_directory):
+    planner = Planner(cache_directory=str(cache_directory))
+    planner.published_packages
+    return planner
+
+
+def only_entry(cache_directory):
+    (file_name,) = os.listdir(cache_directory)
+    return os.path.join(cache_directory, file_name)
+
+
+def test_round_trip(tmp_path):
+    planner = cached_planner(tmp_path)
+    package_list, allocated_trucks, trucks_with_paths, _, plan_state = load_plan(only_entry(tmp_path))
+    assert sorted(package_list) == sorted(planner.package_hash_table.to_list())
+    assert trucks_with_paths == planner.replanner.current.trucks_with_paths
+    assert [[package[0] for package in truck] for truck in allocated_trucks] == \
+        [[package[0] for package in truck] for truck in planner.replanner.current.trucks]
+    assert plan_state["version"] == 2
+
+
+def test_missing_entry_is_a_miss(tmp_path):
+    assert load_plan(str(tmp_path / "missing.plan")) is None
+
+
+# A flipped payload byte, a truncated file, a bad header or a stale format version is deleted and reported as a miss.
+def test_corrupted_entries_are_deleted(tmp_path):
+    cached_planner(tmp_path)
+    cache_file_path = only_entry(tmp_path)
+    with open(cache_file_path, 'rb') as cache_file:
+        data = cache_file.read()
+    magic, version, checksum = HEADER.unpack(data[:HEADER.size])
+    flipped = bytearray(data)
+    flipped[-1] ^= 0xFF
+    corruptions = [bytes(flipped), data[:HEADER.size // 2], b'XXXX' + data[4:],
+                   HEADER.pack(magic, version + 1, checksum) + data[HEADER.size:]]
+    for corrupted in corruptions:
+        with open(cache_file_path, 'wb') as cache_file:
+            cache_file.write(corrupted)
+        assert load_plan(cache_file_path) is None
+        assert not os.path.exists(cache_file_path)
+
+
+def test_a_corrupted_entry_is_rebuilt(tmp_path):
+    planner = cached_planner(tmp_path)
+    cache_file_path = only_entry(tmp_path)
+    with open(cache_file_path, 'r+b') as cache_file:
+        cache_file.seek(HEADER.size + 10)
+        cache_file.write(b'garbage')
+
+    rebuilt = cached_planner(tmp_path)
+    assert rebuilt.replanner.current.trucks_with_paths == planner.replanner.current.trucks_with_paths
+    assert load_plan(cache_file_path) is not None
+
+
+def test_a_valid_checksum_over_an_unreadable_payload_is_a_miss(tmp_path):
+    cache_file_path = str(tmp_path / "bad.plan")
+    save_plan(cache_file_path, [['1']], [['2']], [])
+    assert load_plan(cache_file_path) is None
+    assert not os.path.exists(cache_file_path)
@@ -0,0 +1,89 @@
+import datetime
+
+import pytest
+
+from Distance import datetime_to_seconds
+from HeldKarp import held_karp_truck_path
+from Planner import Planner
+from Replanner import AddressCorrection, LatePackage, TruckDelay
+from Timeline import to_seconds
+
+CORRECTION = AddressCorrection('10:20:00', '9', '410 S State St', 'Salt Lake City', 'UT', '84111')
+
+
+def delivery_seconds(route, package_id):
+    return datetime_to_seconds(route['times'][route['packages'].index(package_id) + 1])
+
+
+# With three drivers truck 3 makes its last delivery before package 9's correction (Planner.DAY_EVENTS) arrives, so
+# the package is routed from the hub after the truck is back, not from its last stop at that earlier time.
+def test_correction_after_the_last_stop_leaves_after_the_event():
+    planner = Planner(driver_count=3)
+    first, corrected = planner.replanner.versions
+    truck_index = next(index for index, truck in enumerate(corrected.trucks)
+                       if any(package[0] == '9' for package in truck))
+    before = first.trucks_with_paths[truck_index]
+    after = corrected.trucks_with_paths[truck_index]
+    assert datetime_to_seconds(before['times'][-1]) < to_seconds(CORRECTION.time)
+
+    assert after['packages'][:-1] == before['packages']
+    assert delivery_seconds(after, '9') > to_seconds(CORRECTION.time)
+    # The miles include the drive back to the hub before the new leg.
+    assert sum(after['distances']) > sum(before['distances'])
+    assert planner.published_packages.lookup('9')[10] == after['times'][-1].strftime('%H:%M:%S')
+
+
+def test_times_never_go_back_after_a_correction():
+    planner = Planner(driver_count=3)
+    for route in planner.trucks_with_paths:
+        assert route['times'] == sorted(route['times'])
+        assert all(isinstance(time, datetime.datetime) for time in route['times'])
+
+
+# Re-routes after an event use the planner's router, here Held-Karp, with the start_index of a truck on the road.
+def test_events_are_routed_with_the_planner_router():
+    calls = []
+
+    def recording_router(*args, **kwargs):
+        calls.append(kwargs)
+        return held_karp_truck_path(*args, **kwargs)
+
+    planner = Planner(truck_router=recording_router)
+    initial_calls = len(planner.allocated_trucks)
+    planner.plan()
+    assert len(calls) > initial_calls
+    assert any(call.get('start_index') is not None for call in calls[initial_calls:])
+
+
+def test_a_delay_holds_back_every_later_stop():
+    planner = Planner(events=(TruckDelay('09:00:00', 1, 600),))
+    first, delayed = planner.replanner.versions
+    before, after = first.trucks_with_paths[0], delayed.trucks_with_paths[0]
+    event_seconds = to_seconds('09:00:00')
+    done = [package_id for package_id, time in zip(before['packages'], before['times'][1:])
+            if datetime_to_seconds(time) <= event_seconds]
+    assert after['packages'][:len(done)] == done
+    assert after['times'][:len(done) + 1] == before['times'][:len(done) + 1]
+    # The next stop is reached 600 seconds later than planned, and nothing after the event is earlier than that.
+    next_arrival = datetime_to_seconds(before['times'][len(done) + 1])
+    assert all(datetime_to_seconds(time) >= next_arrival + 600 for time in after['times'][len(done) + 1:])
+    assert sorted(after['packages']) == sorted(before['packages'])
+
+
+def test_a_late_package_goes_on_a_truck_still_at_the_hub():
+    planner = Planner(events=())
+    package_info = ['41', planner.address_index['410 S State St'], '410 S State St', 'Salt Lake City', 'UT', '84111',
+                    'EOD', '2', 'None', '', 'At the hub']
+    version = planner.replanner.apply(LatePackage('09:00:00', package_info))
+    truck_index = next(index for index, route in enumerate(version.trucks_with_paths) if '41' in route['packages'])
+    assert datetime_to_seconds(version.trucks_with_paths[truck_index]['times'][0]) >= to_seconds('09:00:00')
+    with pytest.raises(ValueError, match="already on a truck"):
+        planner.replanner.apply(LatePackage('09:30:00', package_info))
+
+
+def test_events_must_come_in_time_order():
+    planner = Planner()
+    with pytest.raises(ValueError, match="earlier than the current plan version"):
+        planner.replanner.apply(TruckDelay('09:00:00', 1, 60))
+    with pytest.raises(ValueError, match="Unknown truck"):
+        planner.replanner.apply(TruckDelay('11:00:00', 9, 60))
@@ -0,0 +1,59 @@
+import datetime
+import random
+
+from Distance import (datetime_to_seconds, find_shortest_path, get_distance_matrix, get_travel_seconds_matrix,
+                      prepare_deadlines)
+from Planner import Planner
+from RouteImprovement import improve_routes, RouteImprover
+
+
+def routed_plan():
+    planner = Planner(events=())
+    trucks_with_paths = find_shortest_path(planner.allocated_trucks, planner.addresses_dict, planner.distances_dict)
+    return planner, trucks_with_paths
+
+
+def test_improved_routes_keep_every_package_and_deadline():
+    planner, trucks_with_paths = routed_plan()
+    improved = improve_routes(trucks_with_paths, planner.allocated_trucks, planner.distances_dict, time_budget=5)
+    _, deadlines_dict = prepare_deadlines(planner.allocated_trucks, planner.addresses_dict)
+    assert sum(map(sum, (route['distances'] for route in improved))) <= \
+        sum(map(sum, (route['distances'] for route in trucks_with_paths))) + 1e-9
+    for before, after in zip(trucks_with_paths, improved):
+        assert sorted(after['packages']) == sorted(before['packages'])
+        assert after['path'][0] == after['path'][-1] == before['path'][0]
+        for package_id, time in zip(after['packages'], after['times'][1:]):
+            assert time <= deadlines_dict[package_id]
+
+
+# Published times are whole-second sums of the router's travel times, as build_truck_path publishes them.
+def test_improved_times_use_whole_second_legs():
+    planner, trucks_with_paths = routed_plan()
+    travel_seconds = get_travel_seconds_matrix(get_distance_matrix(planner.distances_dict))
+    for route in improve_routes(trucks_with_paths, planner.allocated_trucks, planner.distances_dict, time_budget=5):
+        seconds = datetime_to_seconds(route['times'][0])
+        for position, time in enumerate(route['times'][1:], start=1):
+            seconds += travel_seconds[route['path'][position - 1]][route['path'][position]]
+            assert time == datetime.datetime(1900, 1, 1) + datetime.timedelta(seconds=seconds)
+
+
+# _is_feasible checks only the changed window and the slack after it; it must agree with timing the whole candidate.
+def test_window_feasibility_matches_a_full_check():
+    rng = random.Random(5)
+    for _ in range(500):
+        n = rng.randint(5, 12)
+        travel_seconds = [[0 if a == b else rng.randint(100, 900) for b in range(n)] for a in range(n)]
+        route = [0] + rng.sample(range(1, n), n - 1) + [0]
+        arrivals = [8 * 3600]
+        for position in range(1, len(route)):
+            arrivals.append(arrivals[-1] + travel_seconds[route[position - 1]][route[position]])
+        deadlines = {route[k]: arrivals[k] + rng.randint(0, 600) for k in range(1, len(route) - 1)}
+        improver = RouteImprover(route, 8 * 3600, deadlines, {}, travel_seconds)
+        i = rng.randint(1, len(route) - 3)
+        j = rng.randint(i + 1, len(route) - 2)
+        candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+        seconds, on_time = 8 * 3600, True
+        for position in range(1, len(candidate) - 1):
+            seconds += travel_seconds[candidate[position - 1]][candidate[position]]
+            on_time = on_time and seconds <= deadlines[candidate[position]]
+        assert improver._is_feasible(candidate, i, j) == on_time
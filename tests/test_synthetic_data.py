@@ -0,0 +1,18 @@
+import random
+
+from SyntheticData import CO_DELIVERY_SHARE, DEADLINES, generate_addresses, generate_packages
+
+
+# The deadline and co-delivery shares hold for a large manifest too, instead of being capped to fit the first wave.
+def test_shares_scale_with_the_manifest():
+    rng = random.Random(1)
+    package_count = 10000
+    packages = generate_packages(package_count, generate_addresses(300, rng), 688, rng)
+    timed_share = sum(share for deadline, share in DEADLINES if deadline != "EOD")
+    timed = sum(1 for package in packages if package[5] != "EOD")
+    grouped = sum(2 + package[7].count("&") for package in packages if package[7].startswith("Must be delivered with"))
+    # Delayed packages are moved to EOD after the deadlines are picked.
+    assert timed > package_count * timed_share * 0.8
+    assert abs(grouped - package_count * CO_DELIVERY_SHARE) <= 4
+    pinned_trucks = {int(package[7].rsplit(" ", 1)[1]) for package in packages if package[7].startswith("Can only")}
+    assert max(pinned_trucks) > 100
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from Planner import Planner
+from TrackerService import parse_query_time, PlanSnapshot, TrackerService
+
+
+def test_query_times():
+    assert parse_query_time('10:30') == 37800
+    assert parse_query_time('9:05:07') == 32707
+    assert parse_query_time('23:59:59') == 86399
+
+
+@pytest.mark.parametrize('time_string', ['10:-5', '9:75', '24:00', '10:30:60', '+9:00', ' 9:00', '9', '9:00:00:00'])
+def test_malformed_or_out_of_range_times_are_rejected(time_string):
+    with pytest.raises(ValueError):
+        parse_query_time(time_string)
+
+
+# Sends raw bytes to a running service and returns (status code, decoded JSON body) of the response.
+async def send(port, request):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def run_service(requests, plan_factory=None):
+    async def run():
+        service = TrackerService(PlanSnapshot(Planner()), plan_factory)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [await send(port, request) for request in requests]
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(run())
+
+
+def test_bad_requests_get_400():
+    responses = run_service([
+        b"POST /health HTTP/1.1\r\nContent-Length: abc\r\nConnection: close\r\n\r\n",
+        b"POST /health HTTP/1.1\r\nContent-Length: -5\r\nConnection: close\r\n\r\n",
+        b"GET /status?time=9:75 HTTP/1.1\r\nConnection: close\r\n\r\n",
+        b"GET /status HTTP/1.1\r\nConnection: close\r\n\r\n",
+    ])
+    assert [status for status, _ in responses] == [400, 400, 400, 400]
+    assert responses[0][1] == {"error": "invalid Content-Length"}
+
+
+def test_oversized_requests_get_413():
+    responses = run_service([
+        b"POST /health HTTP/1.1\r\nContent-Length: 99999999\r\nConnection: close\r\n\r\n",
+        b"GET /health HTTP/1.1\r\nX-Padding: " + b"a" * 70000 + b"\r\n\r\n",
+    ])
+    assert [status for status, _ in responses] == [413, 413]
+
+
+# A failed reload answers 503 and keeps serving the plan it had.
+def test_failed_reload_gets_503_and_keeps_the_plan():
+    def plan_factory():
+        raise FileNotFoundError("Packages.csv missing")
+
+    responses = run_service([
+        b"POST /reload HTTP/1.1\r\nConnection: close\r\n\r\n",
+        b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n",
+    ], plan_factory)
+    assert responses[0] == (503, {"error": "reload failed: Packages.csv missing"})
+    assert responses[1][0] == 200 and responses[1][1]["packages"] == 40
+
+
+def test_reload_without_a_factory_gets_503():
+    status, _ = run_service([b"POST /reload HTTP/1.1\r\nConnection: close\r\n\r\n"])[0]
+    assert status == 503